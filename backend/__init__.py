@@ -1,3 +1,4 @@
 from .real_backend import start_background_stream, tick_storage, stop_background_stream
-from .storage import get_resampled, get_recent
-__all__ = ['start_background_stream', 'stop_background_stream', 'get_resampled', 'get_recent', 'tick_storage']
+from .storage import get_resampled, get_recent, get_range, get_bars
+from .bars import bar_aggregator
+__all__ = ['start_background_stream', 'stop_background_stream', 'get_resampled', 'get_recent', 'get_range', 'get_bars', 'tick_storage', 'bar_aggregator']
@@ -1,25 +1,169 @@
-import threading, time
-from .storage import get_resampled
-from .analytics import compute_spread_zscore
+"""Event-driven alert engine: one shared spread/z-score signal per (symbols, tf, window, hedge_ratio)."""
+import threading, time, queue, math
+from collections import deque
+from .bars import bar_aggregator, normalize_timeframe
+from .storage import get_bars
+from .rolling import PairStats
+from .metrics import registry
+
+ALERT_EVAL_SECONDS = registry.histogram('alert_eval_seconds', 'Closed-bar processing time across affected signals and alerts')
+ALERT_TRIGGERS = registry.counter('alert_triggers_total', 'Alerts fired')
+
+class SpreadSignal:
+    """Spread a - hr*b on closed bars with O(1) rolling z-score stats over the last `window` spreads."""
+    def __init__(self, key):
+        self.key = key
+        (self.s1, self.s2), self.tf, self.window, self.hedge_ratio = key
+        self.stats = PairStats(self.hedge_ratio, windows=(self.window,))
+        self._pending = {}
+        self.last_ts = None
+        self.spread = None; self.z = None
+
+    def _add(self, a, b):
+        self.stats.update(a, b)
+        self.spread = self.stats.spread
+        z = self.stats.zscore(self.window)
+        self.z = None if z is None or math.isnan(z) else z
+
+    def push(self, symbol, ts, close):
+        """Feed one leg's closed bar; returns True once both legs have closed bar `ts`."""
+        if self.last_ts is not None and ts <= self.last_ts: return False
+        legs = self._pending.setdefault(ts, [None, None])
+        if symbol == self.s1: legs[0] = close
+        if symbol == self.s2: legs[1] = close
+        if legs[0] is None or legs[1] is None: return False
+        # bars only one leg traded in never pair up (inner join), drop them
+        for t in [t for t in self._pending if t <= ts]: del self._pending[t]
+        self.last_ts = ts
+        self._add(legs[0], legs[1])
+        return True
+
+    def seed(self, df1, df2):
+        a, b = df1['close'].align(df2['close'], join='inner')
+        a, b = a.iloc[:-1], b.iloc[:-1]  # last bar is still forming
+        ts = a.index.as_unit('ms').asi8.tolist()
+        for t, x, y in zip(ts[-self.window:], a.tolist()[-self.window:], b.tolist()[-self.window:]):
+            self.last_ts = t; self._add(x, y)
+
+class AlertEngine:
+    def __init__(self, on_trigger=None, recent=200, seed=True):
+        self.alerts = {}
+        self.signals = {}
+        self._by_bar = {}   # (symbol, tf) -> [signal, ...]
+        self._alerts_by_signal = {}
+        self._fed_ts = {}   # (symbol, tf) -> last closed bar ts fed while polling the DB
+        self.events = queue.Queue()
+        self.callbacks = [on_trigger] if on_trigger else []
+        self.recent = deque(maxlen=recent)
+        self.evaluations = 0; self.eval_secs = 0.0; self.last_eval_secs = 0.0; self.max_eval_secs = 0.0
+        self.seed = seed    # prime new signals from stored bars (off for replays, whose bars are already stored)
+        self._lock = threading.RLock()
+        self._thread = None
+
+    @staticmethod
+    def signal_key(a):
+        syms = tuple(a.get('symbols', [])[:2])
+        return syms, normalize_timeframe(a.get('tf', '1Min')), int(a.get('window', 20)), float(a.get('hedge_ratio', 1.0))
+
+    def add(self, a):
+        if a.get('metric') not in ('zscore', 'spread') or len(a.get('symbols', [])) < 2: return a
+        key = self.signal_key(a)
+        with self._lock:
+            sig = self.signals.get(key)
+            if sig is None:
+                sig = self.signals[key] = SpreadSignal(key)
+                if self.seed:
+                    df1 = get_bars(sig.s1, sig.tf); df2 = get_bars(sig.s2, sig.tf)
+                    if not df1.empty and not df2.empty: sig.seed(df1, df2)
+                for s in (sig.s1, sig.s2): self._by_bar.setdefault((s, sig.tf), []).append(sig)
+            self.alerts[a['id']] = a
+            self._alerts_by_signal.setdefault(key, []).append(a)
+        return a
+
+    def remove(self, alert_id):
+        with self._lock:
+            a = self.alerts.pop(alert_id, None)
+            if a is None: return
+            key = self.signal_key(a); lst = self._alerts_by_signal.get(key, [])
+            if a in lst: lst.remove(a)
+            if not lst:
+                sig = self.signals.pop(key); self._alerts_by_signal.pop(key, None)
+                for s in (sig.s1, sig.s2):
+                    subs = self._by_bar.get((s, sig.tf), [])
+                    if sig in subs: subs.remove(sig)
+
+    def watching(self, symbol, tf):
+        return (symbol, tf) in self._by_bar
+
+    def on_bar(self, symbol, tf, bar):
+        # called from the ingest thread: just enqueue
+        if self.watching(symbol, tf): self.events.put((symbol, tf, bar[0], bar[4]))
+
+    def process(self, symbol, tf, ts, close):
+        t0 = time.perf_counter()
+        with self._lock:
+            for sig in self._by_bar.get((symbol, tf), ()):
+                if sig.push(symbol, ts, close):
+                    for a in self._alerts_by_signal.get(sig.key, ()): self._evaluate(a, sig)
+        dt = time.perf_counter() - t0
+        ALERT_EVAL_SECONDS.observe(dt)
+        self.evaluations += 1; self.eval_secs += dt; self.last_eval_secs = dt
+        if dt > self.max_eval_secs: self.max_eval_secs = dt
+
+    def _evaluate(self, a, sig):
+        val = sig.z if a.get('metric') == 'zscore' else sig.spread
+        if val is None: return
+        op = a.get('op', '>'); thr = float(a.get('value', 2.0))
+        if (op == '>' and val > thr) or (op == '<' and val < thr):
+            ev = {'alert': a, 'value': val, 'ts': sig.last_ts, 'fired_at': time.time()}
+            self.recent.append(ev); ALERT_TRIGGERS.inc()
+            for cb in self.callbacks:
+                try: cb(ev)
+                except Exception as e: print('alert callback error', e)
+
+    def poll(self):
+        """Feed newly closed DB bars for (symbol, tf) pairs that are not streaming in this process."""
+        for symbol, tf in list(self._by_bar):
+            if bar_aggregator.has(symbol, tf): continue
+            df = get_bars(symbol, tf)
+            if df.empty or len(df) < 2: continue
+            last = self._fed_ts.get((symbol, tf))
+            ts = df.index.as_unit('ms').asi8[:-1].tolist(); closes = df['close'].tolist()[:-1]
+            for t, c in zip(ts, closes):
+                if last is None or t > last: self.process(symbol, tf, t, c)
+            self._fed_ts[(symbol, tf)] = ts[-1] if ts else last
+
+    def run(self, poll_interval=5):
+        next_poll = 0.0
+        while True:
+            try:
+                symbol, tf, ts, close = self.events.get(timeout=1.0)
+                self.process(symbol, tf, ts, close)
+            except queue.Empty:
+                pass
+            except Exception as e:
+                print('alert error', e)
+            if time.monotonic() >= next_poll:
+                try: self.poll()
+                except Exception as e: print('alert error', e)
+                next_poll = time.monotonic() + poll_interval
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        bar_aggregator.subscribe(self.on_bar)
+        self._thread = threading.Thread(target=self.run, daemon=True); self._thread.start()
+
+    def stats(self):
+        return {'alerts': len(self.alerts), 'signals': len(self.signals), 'evaluations': self.evaluations,
+                'mean_eval_ms': 1000*self.eval_secs/self.evaluations if self.evaluations else 0.0,
+                'last_eval_ms': 1000*self.last_eval_secs, 'max_eval_ms': 1000*self.max_eval_secs, 'queued': self.events.qsize()}
+
+engine = AlertEngine()
+registry.gauge('alert_queue_depth', 'Closed bars waiting for the alert thread').set_function(lambda: engine.events.qsize())
 ALERTS = []
 def add_alert(a):
-    ALERTS.append(a); return a
+    ALERTS.append(a); engine.add(a); return a
 def check_loop(interval=5):
-    while True:
-        try:
-            for a in list(ALERTS):
-                if a.get('metric')=='zscore' and len(a.get('symbols',[]))>=2:
-                    s1,s2 = a['symbols'][:2]
-                    df1=get_resampled(s1,a.get('tf','1Min')); df2=get_resampled(s2,a.get('tf','1Min'))
-                    if df1.empty or df2.empty: continue
-                    spread,z = compute_spread_zscore(df1,df2,a.get('hedge_ratio',1.0), a.get('window',20))
-                    val = float(z.dropna().iloc[-1]) if not z.dropna().empty else None
-                    if val is None: continue
-                    op = a.get('op','>'); thr = float(a.get('value',2.0))
-                    if (op=='>' and val>thr) or (op=='<' and val<thr):
-                        print('ALERT TRIGGERED', a)
-        except Exception as e:
-            print('alert error', e)
-        time.sleep(interval)
+    engine.run(poll_interval=interval)
 def start_alert_thread():
-    t = threading.Thread(target=check_loop, daemon=True); t.start()
+    engine.start()
@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 from statsmodels.tsa.stattools import adfuller
+from .rolling import rolling_zscores, rolling_corrs
 def compute_price_stats(df):
     s = df['price'] if 'price' in df.columns else df['close']
     return {'mean': float(s.mean()), 'std': float(s.std()), 'min': float(s.min()), 'max': float(s.max())}
@@ -21,8 +22,16 @@ def compute_spread_zscore(df_a, df_b, hedge_ratio=1.0, window=30):
     b = df_b['close'] if 'close' in df_b.columns else df_b['price']
     a,b = a.align(b, join='inner')
     spread = a - hedge_ratio*b
-    z = (spread - spread.rolling(window).mean())/spread.rolling(window).std()
+    z = pd.Series(rolling_zscores(spread.to_numpy(dtype='float64'), [window])[window], index=spread.index)
     return spread, z
+def compute_spread_zscores(df_a, df_b, hedge_ratio=1.0, windows=(30,)):
+    # several windows share one pass over the aligned spread
+    a = df_a['close'] if 'close' in df_a.columns else df_a['price']
+    b = df_b['close'] if 'close' in df_b.columns else df_b['price']
+    a,b = a.align(b, join='inner')
+    spread = a - hedge_ratio*b
+    zs = rolling_zscores(spread.to_numpy(dtype='float64'), list(windows))
+    return spread, {w: pd.Series(z, index=spread.index) for w, z in zs.items()}
 def run_adf_test(series):
     try:
         res = adfuller(series.dropna())
@@ -33,26 +42,71 @@ def rolling_correlation(df_a, df_b, window=30):
     a = df_a['close'] if 'close' in df_a.columns else df_a['price']
     b = df_b['close'] if 'close' in df_b.columns else df_b['price']
     a,b = a.align(b, join='inner')
-    return a.rolling(window).corr(b)
+    return pd.Series(rolling_corrs(a.to_numpy(dtype='float64'), b.to_numpy(dtype='float64'), [window])[window], index=a.index)
+class KalmanHedge:
+    """Online 2-state (intercept, slope) Kalman filter with the 2x2 algebra in closed form."""
+    def __init__(self, delta=1e-5, ve=0.001):
+        self.vw = delta/(1-delta); self.ve = ve
+        self.b0 = 0.0; self.b1 = 0.0
+        self.p00 = 1.0; self.p01 = 0.0; self.p11 = 1.0
+        self.n = 0
+    def state(self):
+        return (self.b0, self.b1, self.p00, self.p01, self.p11, self.n)
+    def restore(self, st):
+        self.b0, self.b1, self.p00, self.p01, self.p11, self.n = st
+    def update(self, x, y):
+        self.run([x], [y]); return self.b1
+    def run(self, xs, ys):
+        """Filter a batch of bars, returning the slope after each one."""
+        vw = self.vw; ve = self.ve
+        b0, b1, p00, p01, p11, n = self.state()
+        xs = xs.tolist() if hasattr(xs, 'tolist') else list(xs)
+        ys = ys.tolist() if hasattr(ys, 'tolist') else list(ys)
+        out = np.empty(len(xs))
+        for i, (xt, yt) in enumerate(zip(xs, ys)):
+            if n == 0:
+                # first observation only initialises the filter
+                n = 1; out[i] = b1; continue
+            r00 = p00 + vw; r01 = p01; r11 = p11 + vw
+            rx0 = r00 + r01*xt; rx1 = r01 + r11*xt
+            q = rx0 + xt*rx1 + ve
+            k0 = rx0/q; k1 = rx1/q
+            e = yt - (b0 + b1*xt)
+            b0 += k0*e; b1 += k1*e
+            p00 = r00 - k0*rx0; p01 = r01 - k0*rx1; p11 = r11 - k1*rx1
+            n += 1; out[i] = b1
+        self.b0, self.b1, self.p00, self.p01, self.p11, self.n = b0, b1, p00, p01, p11, n
+        return out
 def compute_hedge_ratio_kalman(y, x):
     y = y.dropna(); x = x.dropna()
     x,y = x.align(y, join='inner')
-    n = len(x)
-    if n==0: return []
-    delta = 1e-5
-    Vw = delta/(1-delta)*np.eye(2)
-    Ve = 0.001
-    beta = np.zeros((2,n))
-    P = np.eye(2)
-    for t in range(n):
-        xt = np.array([1.0, x.iloc[t]])
-        if t==0:
-            beta[:,t]=0; continue
-        R = P + Vw
-        yhat = xt.dot(beta[:,t-1])
-        e = y.iloc[t] - yhat
-        Q = xt.dot(R).dot(xt.T) + Ve
-        K = R.dot(xt)/Q
-        beta[:,t] = beta[:,t-1] + K*e
-        P = R - np.outer(K, xt).dot(R)
-    return beta[1,:]
+    if len(x)==0: return []
+    return KalmanHedge().run(x.to_numpy(dtype='float64'), y.to_numpy(dtype='float64'))
+_KALMAN_STATES = {}
+def kalman_hedge_series(key, y, x, delta=1e-5, ve=0.001):
+    """Kalman hedge ratios for an aligned pair, keeping filter state per key across calls.
+
+    Only bars newer than the last one filtered are fed; the final (still forming) bar is
+    evaluated on a copy of the state so it can be revised on the next call.
+    """
+    y = y.dropna(); x = x.dropna()
+    x,y = x.align(y, join='inner')
+    if len(x)==0: return pd.Series(dtype='float64')
+    st = _KALMAN_STATES.get(key)
+    if st is None or st['params'] != (delta, ve):
+        st = {'params': (delta, ve), 'kf': KalmanHedge(delta, ve), 'last_ts': None, 'hist': pd.Series(dtype='float64')}
+        _KALMAN_STATES[key] = st
+    closed_x, closed_y = x.iloc[:-1], y.iloc[:-1]
+    if st['last_ts'] is not None:
+        new = closed_x.index > st['last_ts']
+        closed_x, closed_y = closed_x[new], closed_y[new]
+    if len(closed_x):
+        betas = st['kf'].run(closed_x.to_numpy(dtype='float64'), closed_y.to_numpy(dtype='float64'))
+        st['hist'] = pd.concat([st['hist'], pd.Series(betas, index=closed_x.index)]).iloc[-len(x):]
+        st['last_ts'] = closed_x.index[-1]
+    kf = st['kf']; saved = kf.state()
+    last = kf.update(float(x.iloc[-1]), float(y.iloc[-1])) if x.index[-1] != st['last_ts'] else kf.b1
+    kf.restore(saved)
+    out = st['hist'].loc[st['hist'].index >= x.index[0]]
+    if x.index[-1] != st['last_ts']: out = pd.concat([out, pd.Series([last], index=x.index[-1:])])
+    return out
@@ -0,0 +1,108 @@
+"""Vectorized parameter-grid backtester for the z-score pairs strategy.
+
+Every (entry z, exit z) combination for a window is evaluated as one row of a 2-D position matrix,
+and (window, grid block) tasks are spread across a process pool.
+"""
+import os, time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+import numpy as np, pandas as pd
+from .analytics import KalmanHedge, compute_hedge_ratio_ols
+from .rolling import rolling_zscores
+from .rollups import tf_millis
+from .storage import get_resampled
+
+RESULT_COLUMNS = ['window', 'entry_z', 'exit_z', 'hedge_mode', 'pnl', 'sharpe', 'turnover', 'max_drawdown', 'trades']
+CHUNK_CELLS = 8_000_000  # bound on grid rows x bars held in memory at once
+
+def load_pair(s1, s2, timeframe='1Min', start=None, end=None, limit=1_000_000):
+    """Aligned close prices for two symbols from stored bars."""
+    a = get_resampled(s1, timeframe, limit=limit, start=start, end=end)
+    b = get_resampled(s2, timeframe, limit=limit, start=start, end=end)
+    if a.empty or b.empty: return pd.Series(dtype='float64'), pd.Series(dtype='float64')
+    return a['close'].align(b['close'], join='inner')
+
+def hedge_ratios(a, b, mode):
+    """Per-bar hedge ratio: a full-sample OLS slope (in-sample) or the causal Kalman filter path."""
+    if mode == 'kalman':
+        return KalmanHedge().run(b, a)
+    hr = compute_hedge_ratio_ols(pd.DataFrame({'close': a}), pd.DataFrame({'close': b}))['hedge_ratio']
+    return np.full(len(a), hr)
+
+def _ffill_rows(sig):
+    """Forward-fill NaNs along axis 1; leading NaNs become 0 (flat)."""
+    n = sig.shape[1]
+    idx = np.where(np.isnan(sig), 0, np.arange(n))
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    out = np.take_along_axis(sig, idx, axis=1)
+    return np.nan_to_num(out, nan=0.0)
+
+def positions(z, entries, exits):
+    """Hysteresis positions for each (entry, exit) row.
+
+    A long opens below -entry and closes once z crosses back up to -exit; a short opens above +entry
+    and closes once z crosses down to +exit. Each side is forward-filled on its own, so exit=0 closes
+    on the zero crossing rather than waiting for the opposite entry.
+    """
+    e = entries[:, None]; x = exits[:, None]
+    long = _ffill_rows(np.where(z < -e, 1.0, np.where(z >= -x, 0.0, np.nan)))
+    short = _ffill_rows(np.where(z > e, 1.0, np.where(z <= x, 0.0, np.nan)))
+    return long - short
+
+def _leg_pnl(a, b, beta):
+    """Return of one unit of spread per bar, on gross notional a + |hr| b."""
+    gross = a[:-1] + np.abs(beta[:-1]) * b[:-1]
+    return (np.diff(a) - beta[:-1]*np.diff(b)) / gross
+
+def _evaluate(args):
+    w, z, leg_pnl, mode, g, bars_per_year, cost = args
+    pos = positions(z, g[:, 0], g[:, 1])
+    dpos = np.abs(np.diff(pos, axis=1, prepend=0.0))
+    ret = pos[:, :-1] * leg_pnl - cost * dpos[:, :-1]
+    eq = np.cumsum(ret, axis=1)
+    sd = ret.std(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(sd > 0, ret.mean(axis=1) / sd * np.sqrt(bars_per_year), 0.0)
+    dd = (np.maximum.accumulate(eq, axis=1) - eq).max(axis=1) if eq.shape[1] else np.zeros(len(g))
+    trades = ((pos[:, 1:] != 0) & (pos[:, 1:] != pos[:, :-1])).sum(axis=1)
+    return [(w, ez, xz, mode, eq[r, -1] if eq.shape[1] else 0.0, sharpe[r], dpos[r].sum(), dd[r], int(trades[r]))
+            for r, (ez, xz) in enumerate(g)]
+
+def run_grid(a, b, windows=(20, 30, 60), entries=(1.5, 2.0, 2.5), exits=(0.0, 0.5), modes=('ols', 'kalman'),
+             timeframe='1Min', cost_bps=0.0, workers=None):
+    """Evaluate every (window, entry, exit, hedge mode) on aligned close series a, b.
+
+    PnL and drawdown are summed per-bar returns on gross notional (a + |hr| b); Sharpe is annualised
+    for 24/7 trading at `timeframe`; turnover is total absolute position change. Combinations with
+    exit >= entry are skipped. Returns a DataFrame sorted by Sharpe.
+    """
+    a = np.asarray(a, dtype='float64'); b = np.asarray(b, dtype='float64')
+    if len(a) < 3: return pd.DataFrame(columns=RESULT_COLUMNS)
+    grid = np.array([(e, x) for e, x in product(entries, exits) if x < e], dtype='float64')
+    if not len(grid): return pd.DataFrame(columns=RESULT_COLUMNS)
+    bars_per_year = 365*24*3600*1000 / (tf_millis(timeframe) or 60000)
+    cost = cost_bps / 1e4
+    windows = [w for w in windows if 1 < w < len(a)]
+    workers = workers or os.cpu_count() or 1
+    # tasks are (window, grid block) pairs: split the grid so a short window list still fills every worker
+    per_window = -(-workers // max(len(windows)*len(modes), 1))
+    step = max(1, min(CHUNK_CELLS // len(a), -(-len(grid) // per_window)))
+    tasks = []
+    for mode in modes:
+        beta = hedge_ratios(a, b, mode)
+        leg_pnl = _leg_pnl(a, b, beta)
+        zs = rolling_zscores(a - beta*b, windows)  # once per window, shared by all of its blocks
+        tasks += [(w, zs[w], leg_pnl, mode, grid[k:k+step], bars_per_year, cost) for w in windows for k in range(0, len(grid), step)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(min(workers, len(tasks))) as pool: results = list(pool.map(_evaluate, tasks))
+    else:
+        results = [_evaluate(t) for t in tasks]
+    df = pd.DataFrame([r for res in results for r in res], columns=RESULT_COLUMNS)
+    return df.sort_values('sharpe', ascending=False).reset_index(drop=True)
+
+def backtest_pair(s1, s2, timeframe='1Min', start=None, end=None, **grid):
+    """Load stored bars for a pair and run the grid; returns (results, seconds)."""
+    t0 = time.perf_counter()
+    a, b = load_pair(s1, s2, timeframe, start, end)
+    res = run_grid(a.to_numpy(), b.to_numpy(), timeframe=timeframe, **grid)
+    return res, time.perf_counter() - t0
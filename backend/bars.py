@@ -0,0 +1,116 @@
+"""Streaming OHLCV bar builder: keeps rolling 1s/1Min/5Min bars per symbol, updated tick by tick."""
+import threading
+from collections import deque
+from itertools import islice
+import numpy as np, pandas as pd
+
+TIMEFRAMES = {'1S': 1000, '1Min': 60000, '5Min': 300000}
+MAX_BARS = 5000
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+def normalize_timeframe(timeframe):
+    tf = timeframe or '1Min'
+    if tf.lower() in ['1s', '1sec', '1second']: return '1S'
+    if tf.lower() == '1min': return '1Min'
+    if tf.lower() == '5min': return '5Min'
+    return tf
+
+def bars_to_frame(rows):
+    arr = np.asarray(rows, dtype='float64')
+    if arr.size == 0: return pd.DataFrame()
+    idx = pd.to_datetime(arr[:, 0].astype('int64'), unit='ms')
+    out = pd.DataFrame(arr[:, 1:6], index=idx, columns=BAR_COLUMNS)
+    out.index.name = 'timestamp'
+    out['price_mean'] = (out['open'] + out['close']) / 2
+    return out
+
+class BarAggregator:
+    def __init__(self, timeframes=None, max_bars=MAX_BARS):
+        self.timeframes = dict(timeframes or TIMEFRAMES)
+        self.max_bars = max_bars
+        self._closed = {}   # (symbol, tf) -> deque of [start_ms, o, h, l, c, v]
+        self._current = {}  # (symbol, tf) -> [start_ms, o, h, l, c, v]
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.late_ticks = 0
+
+    def subscribe(self, fn):
+        """Call fn(symbol, timeframe, bar) with [start_ms, o, h, l, c, v] whenever a bar closes."""
+        if fn not in self._listeners: self._listeners.append(fn)
+
+    def unsubscribe(self, fn):
+        if fn in self._listeners: self._listeners.remove(fn)
+
+    def update(self, symbol, ts, price, qty):
+        closed_now = None
+        with self._lock:
+            for tf, ms in self.timeframes.items():
+                key = (symbol, tf)
+                start = ts - ts % ms
+                cur = self._current.get(key)
+                if cur is None:
+                    self._current[key] = [start, price, price, price, price, qty]
+                    self._closed[key] = deque(maxlen=self.max_bars)
+                elif start == cur[0]:
+                    if price > cur[2]: cur[2] = price
+                    if price < cur[3]: cur[3] = price
+                    cur[4] = price; cur[5] += qty
+                elif start > cur[0]:
+                    self._closed[key].append(cur)
+                    self._current[key] = [start, price, price, price, price, qty]
+                    if self._listeners:
+                        if closed_now is None: closed_now = []
+                        closed_now.append((tf, list(cur)))
+                else:
+                    # late tick: fold into the matching closed bar if it is still held, else count and drop
+                    closed = self._closed[key]
+                    if closed and closed[-1][0] == start:
+                        bar = closed[-1]
+                        if price > bar[2]: bar[2] = price
+                        if price < bar[3]: bar[3] = price
+                        bar[5] += qty
+                    else:
+                        self.late_ticks += 1
+        if closed_now:
+            for tf, bar in closed_now:
+                for fn in list(self._listeners): fn(symbol, tf, bar)
+
+    def seed(self, symbol, timeframe, df):
+        """Prepend historical bars (e.g. from get_resampled) that end before the first live bar."""
+        tf = normalize_timeframe(timeframe); key = (symbol, tf)
+        if df is None or df.empty: return 0
+        starts = df.index.as_unit('ms').asi8.tolist()
+        rows = [[s, o, h, l, c, v] for s, o, h, l, c, v in zip(starts, df['open'].tolist(), df['high'].tolist(), df['low'].tolist(), df['close'].tolist(), df['volume'].tolist())]
+        with self._lock:
+            closed = self._closed.setdefault(key, deque(maxlen=self.max_bars))
+            cur = self._current.get(key)
+            first = closed[0][0] if closed else (cur[0] if cur else None)
+            if first is not None: rows = [r for r in rows if r[0] < first]
+            if cur is None and rows: self._current[key] = rows.pop()
+            room = self.max_bars - len(closed)
+            if room > 0 and rows: closed.extendleft(reversed(rows[-room:]))
+        return len(rows)
+
+    def has(self, symbol, timeframe='1Min'):
+        return (symbol, normalize_timeframe(timeframe)) in self._current
+
+    def latest(self, symbol, timeframe='1Min', n=None):
+        """Latest n bars (including the open one) as a DataFrame shaped like get_resampled."""
+        key = (symbol, normalize_timeframe(timeframe))
+        with self._lock:
+            cur = self._current.get(key)
+            if cur is None: return pd.DataFrame()
+            closed = self._closed[key]
+            rows = list(closed) if n is None or n > len(closed) else list(islice(reversed(closed), max(n - 1, 0)))[::-1]
+            rows.append(cur)
+            arr = np.array(rows, dtype='float64')
+        return bars_to_frame(arr)
+
+    def symbols(self):
+        return sorted({s for s, _ in self._current})
+
+    def clear(self):
+        with self._lock:
+            self._closed.clear(); self._current.clear(); self.late_ticks = 0
+
+bar_aggregator = BarAggregator()
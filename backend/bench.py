@@ -0,0 +1,156 @@
+"""End-to-end benchmark suite with JSON output: replay throughput, persist hand-off and per-sink write latency, query latency vs DB size, analytics timings.
+
+    QUANT_DB_PATH=/tmp/bench.db python -m backend.bench --out bench.json
+    QUANT_DB_PATH=/tmp/bench.db python -m backend.bench --baseline bench.json --tolerance 0.25
+
+The suite writes ticks, so it refuses to run against the default database unless --force is given.
+With --baseline, exits non-zero when any timing (a key containing _ms) grew, or any *_per_sec rate
+fell, by more than the tolerance.
+"""
+import argparse, json, os, platform, sys, time
+import numpy as np, pandas as pd
+from . import partitions, rollups
+from .analytics import (KalmanHedge, compute_hedge_ratio_ols, compute_spread_zscore, compute_spread_zscores,
+                        rolling_correlation, run_adf_test)
+from .backtest import run_grid
+from .replay import replay, synthetic_ticks
+from .rolling import rolling_zscores
+from .scanner import pair_regressions
+from .sinks import DROP_OLDEST, FakeSink, SinkHub
+from .sqlite_io import DBPATH, get_writer
+from .storage import get_range, get_recent, get_resampled, invalidate_cache
+
+def _time(fn, repeat=5):
+    """Median and best wall time of fn() in milliseconds."""
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); out.append(1000*(time.perf_counter() - t0))
+    return {'median_ms': float(np.median(out)), 'min_ms': float(min(out))}
+
+def bench_replay(n=200000, symbols=('BENCHAUSDT', 'BENCHBUSDT')):
+    """Max-speed replay of a synthetic tape through its rings, persist, get_resampled and analytics.
+
+    handoff_ms_* times only draining the rings onto the sink queues; the durable write latency is
+    each sink's write_ms_*, and timings.flush_ms the wait for the last batches to land.
+    """
+    tape = synthetic_ticks(list(symbols), n, step_ms=20)
+    res = replay(tape, speed=None, persist_ms=5000)
+    keep = ('ticks', 'replayed', 'persisted', 'ticks_per_sec', 'persist_batches', 'handoff_ms_p50', 'handoff_ms_p99', 'timings', 'error')
+    out = {k: res[k] for k in keep}
+    out['sinks'] = [{k: s[k] for k in ('sink', 'written', 'dropped', 'failed', 'write_ms_p50', 'write_ms_p99')} for s in res['sinks']]
+    return out
+
+def _db_ticks():
+    with get_writer().transaction() as cur:
+        return partitions.count(cur)
+
+def bench_queries(sizes=(10000, 100000, 500000), symbol='BENCHQUSDT', repeat=5):
+    """Grow one symbol's history to each size and time cold (cache cleared) and warm queries at each."""
+    writer = get_writer(); out = []; have = 0
+    for size in sorted(set(sizes)):
+        if size > have:
+            ts, _, price, qty = synthetic_ticks([symbol], size - have, step_ms=100, seed=size)
+            ts = ts + have*100
+            for i in range(0, len(ts), 100000):
+                rollups.write_batches(writer, {symbol: (ts[i:i+100000], price[i:i+100000], qty[i:i+100000])})
+            have = size
+        invalidate_cache()
+        mid = int(ts[len(ts)//2])
+        row = {'symbol_ticks': size, 'db_ticks': _db_ticks(), 'db_bytes': os.path.getsize(DBPATH)}
+        def cold(fn):
+            def run(): invalidate_cache(); fn()
+            return _time(run, repeat)
+        row['get_recent_1000'] = {'cold': cold(lambda: get_recent(symbol, 1000)), 'warm': _time(lambda: get_recent(symbol, 1000), repeat)}
+        row['get_range_1h'] = {'cold': cold(lambda: get_range(symbol, mid, mid + 3_600_000))}
+        for tf in ('1S', '1Min', '5Min'):
+            row[f'get_resampled_{tf}'] = {'cold': cold(lambda: get_resampled(symbol, tf)), 'warm': _time(lambda: get_resampled(symbol, tf), repeat)}
+        out.append(row)
+    return out
+
+def bench_analytics(n=20000, repeat=5):
+    """Per-function timings on n aligned 1-minute bars."""
+    ts, _, price, _ = synthetic_ticks(['A', 'B'], 2*n, step_ms=30000, seed=1)
+    idx = pd.to_datetime(ts[::2], unit='ms')
+    a = pd.DataFrame({'close': price[::2]}, index=idx); b = pd.DataFrame({'close': price[1::2]}, index=idx)
+    spread = a['close'] - b['close']
+    P = np.column_stack([price[::2]*(1 + 0.01*k) for k in range(20)])
+    out = {'bars': n,
+           'compute_hedge_ratio_ols': _time(lambda: compute_hedge_ratio_ols(a, b), repeat),
+           'compute_spread_zscore': _time(lambda: compute_spread_zscore(a, b, window=30), repeat),
+           'compute_spread_zscores_4w': _time(lambda: compute_spread_zscores(a, b, windows=(20, 30, 60, 120)), repeat),
+           'rolling_correlation': _time(lambda: rolling_correlation(a, b, window=30), repeat),
+           'rolling_zscores_4w': _time(lambda: rolling_zscores(spread.to_numpy(), [20, 30, 60, 120]), repeat),
+           'kalman_run': _time(lambda: KalmanHedge().run(b['close'].to_numpy(), a['close'].to_numpy()), repeat),
+           'pair_regressions_20sym': _time(lambda: pair_regressions(P), repeat),
+           'run_adf_test': _time(lambda: run_adf_test(spread), max(1, repeat // 2)),
+           'run_grid_small': _time(lambda: run_grid(a['close'].to_numpy(), b['close'].to_numpy(), windows=(20, 60), workers=1), 1)}
+    return out
+
+def bench_sinks(batches=200, batch_ticks=5000, slow_latency=0.2):
+    """Fan-out isolation: submit latency and delivery with one fast and one slow (injected latency) sink."""
+    ts, _, price, qty = synthetic_ticks(['S'], batch_ticks)
+    hub = SinkHub([FakeSink('fast', max_ticks=50*batch_ticks), FakeSink('slow', latency=slow_latency, max_ticks=10*batch_ticks, policy=DROP_OLDEST)])
+    hub.start(); lat = []
+    for _ in range(batches):
+        t0 = time.perf_counter(); hub.submit({'S': (ts, price, qty)}); lat.append(1000*(time.perf_counter() - t0))
+        time.sleep(0.001)
+    hub.flush(timeout=30); hub.stop()
+    return {'submit_ms_p50': float(np.percentile(lat, 50)), 'submit_ms_p99': float(np.percentile(lat, 99)),
+            'sinks': [{k: s[k] for k in ('sink', 'written', 'dropped', 'failed', 'write_ms_p50', 'write_ms_p99')} for s in hub.stats()]}
+
+def run_all(replay_ticks=200000, sizes=(10000, 100000, 500000), bars=20000, ingest_seconds=0):
+    res = {'meta': {'started': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(), 'numpy': np.__version__,
+                    'pandas': pd.__version__, 'platform': platform.platform(), 'cpus': os.cpu_count(), 'db': DBPATH}}
+    t0 = time.perf_counter()
+    res['replay'] = bench_replay(replay_ticks)
+    res['queries'] = bench_queries(sizes)
+    res['analytics'] = bench_analytics(bars)
+    res['sink_fanout'] = bench_sinks()
+    if ingest_seconds:
+        from .ws_standin import run_bench
+        res['ingest'] = run_bench(seconds=ingest_seconds)
+    res['meta']['seconds'] = time.perf_counter() - t0
+    return res
+
+def _flatten(d, prefix=''):
+    out = {}
+    if isinstance(d, list):
+        for row in d: out.update(_flatten(row, f"{prefix}{row.get('symbol_ticks', row.get('sink', ''))}."))
+    elif isinstance(d, dict):
+        for k, v in d.items():
+            if k == 'meta': continue
+            if isinstance(v, (dict, list)): out.update(_flatten(v, f'{prefix}{k}.'))
+            elif isinstance(v, (int, float)): out[prefix + k] = v
+    return out
+
+def compare(current, baseline, tolerance=0.25):
+    """Metrics that regressed by more than tolerance: [(name, baseline, current)]."""
+    cur, base = _flatten(current), _flatten(baseline); worse = []
+    for k, b in base.items():
+        c = cur.get(k); leaf = k.rsplit('.', 1)[-1]
+        if c is None or not b: continue
+        if ('_ms' in leaf and c > b*(1 + tolerance)) or (leaf.endswith('per_sec') and c < b*(1 - tolerance)):
+            worse.append((k, b, c))
+    return worse
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Run the pipeline benchmark suite and print JSON results.')
+    ap.add_argument('--replay-ticks', type=int, default=200000)
+    ap.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 500000], help='per-symbol DB sizes for query timings')
+    ap.add_argument('--bars', type=int, default=20000)
+    ap.add_argument('--ingest-seconds', type=float, default=0, help='also run the websocket ingest benchmark')
+    ap.add_argument('--out'); ap.add_argument('--baseline')
+    ap.add_argument('--tolerance', type=float, default=0.25)
+    ap.add_argument('--force', action='store_true', help='allow writing benchmark ticks into the default database')
+    a = ap.parse_args()
+    if not os.getenv('QUANT_DB_PATH') and not a.force:
+        sys.exit('set QUANT_DB_PATH to a scratch database (or pass --force)')
+    res = run_all(a.replay_ticks, a.sizes, a.bars, a.ingest_seconds)
+    if a.baseline:
+        with open(a.baseline) as fh: worse = compare(res, json.load(fh), a.tolerance)
+        res['regressions'] = [{'metric': k, 'baseline': b, 'current': c} for k, b, c in worse]
+    text = json.dumps(res, indent=2, default=str)
+    if a.out:
+        with open(a.out, 'w') as fh: fh.write(text)
+    print(text)
+    if a.baseline and res['regressions']: sys.exit(1)
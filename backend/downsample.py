@@ -0,0 +1,37 @@
+"""Downsampling for charts: LTTB for lines and bucketed OHLC for candles, so payloads fit a pixel budget."""
+import numpy as np, pandas as pd
+
+def lttb_indices(x, y, n_out):
+    """Indices chosen by largest-triangle-three-buckets; always keeps the first and last points."""
+    n = len(x)
+    if n_out >= n or n_out < 3: return np.arange(n)
+    x = np.asarray(x, dtype='float64'); y = np.asarray(y, dtype='float64')
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out-2 buckets between the end points
+    out = np.empty(n_out, dtype=np.int64); out[0] = 0; out[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        # the average of the next bucket stands in for its (not yet chosen) point
+        cx = x[nlo:nhi].mean() if nhi > nlo else x[-1]; cy = y[nlo:nhi].mean() if nhi > nlo else y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area)) if hi > lo else lo
+        out[i + 1] = a
+    return out
+
+def downsample_series(s, n_out=1500):
+    """LTTB-downsample a time-indexed Series (NaNs dropped first)."""
+    s = s.dropna()
+    if len(s) <= n_out: return s
+    idx = lttb_indices(s.index.asi8, s.to_numpy(dtype='float64'), n_out)
+    return s.iloc[idx]
+
+def downsample_ohlc(df, n_out=1500):
+    """Merge consecutive bars into at most n_out candles (first open, max high, min low, last close, summed volume)."""
+    if len(df) <= n_out: return df
+    groups = np.arange(len(df)) * n_out // len(df)
+    agg = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'}
+    if 'volume' in df.columns: agg['volume'] = 'sum'
+    out = df.groupby(groups).agg(agg)
+    out.index = pd.DatetimeIndex(df.index.to_series().groupby(groups).first().values, name=df.index.name)
+    return out
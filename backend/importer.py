@@ -0,0 +1,129 @@
+"""Streaming NDJSON/CSV tick importer: chunked parsing (optionally on a process pool) and bulk inserts.
+
+    python -m backend.importer ticks.ndjson [--workers 4] [--chunk 200000]
+"""
+import argparse, csv, gzip, json, os, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from .sqlite_io import get_writer
+from .rollups import write_batches, rows_to_batches
+from .storage import invalidate_cache
+try:
+    import orjson
+    _loads = orjson.loads
+except Exception:
+    _loads = json.loads
+
+TS_KEYS = ('ts', 'timestamp', 'T', 'time')
+SYMBOL_KEYS = ('symbol', 's')
+PRICE_KEYS = ('price', 'p')
+QTY_KEYS = ('size', 'q', 'qty', 'quantity')
+
+def _first(d, keys):
+    for k in keys:
+        v = d.get(k)
+        if v not in (None, ''): return v
+    return None
+
+def _ts_ms(v, now):
+    if v is None: return now
+    try: return int(float(v))
+    except (TypeError, ValueError): return int(pd.Timestamp(v).value // 1_000_000)
+
+def parse_ndjson(lines):
+    """Parse a chunk of NDJSON byte lines into ((ts, symbol, price, qty) rows, skipped)."""
+    now = int(time.time()*1000); rows = []; skipped = 0
+    for line in lines:
+        if not line.strip(): continue
+        try:
+            j = _loads(line)
+            if not isinstance(j, dict): skipped += 1; continue
+            j = j.get('data', j)
+            rows.append((_ts_ms(_first(j, TS_KEYS), now), _first(j, SYMBOL_KEYS) or 'UNKNOWN',
+                         float(_first(j, PRICE_KEYS) or 0.0), float(_first(j, QTY_KEYS) or 0.0)))
+        except Exception:
+            skipped += 1
+    return rows, skipped
+
+def parse_csv(lines, header):
+    """Parse a chunk of CSV byte lines using the file's header row."""
+    now = int(time.time()*1000); rows = []; skipped = 0
+    for rec in csv.reader(l.decode('utf-8', 'ignore') for l in lines if l.strip()):
+        try:
+            j = dict(zip(header, rec))
+            rows.append((_ts_ms(_first(j, TS_KEYS), now), _first(j, SYMBOL_KEYS) or 'UNKNOWN',
+                         float(_first(j, PRICE_KEYS) or 0.0), float(_first(j, QTY_KEYS) or 0.0)))
+        except Exception:
+            skipped += 1
+    return rows, skipped
+
+def _parse(args):
+    fmt, lines, header = args
+    return parse_csv(lines, header) if fmt == 'csv' else parse_ndjson(lines)
+
+def _open(src):
+    """Binary file object for a path or an already-open (uploaded) file, transparently gunzipping."""
+    fh = open(src, 'rb') if isinstance(src, (str, os.PathLike)) else src
+    head = fh.peek(2)[:2] if hasattr(fh, 'peek') else None
+    if head is None and fh.seekable():
+        pos = fh.tell(); head = fh.read(2); fh.seek(pos)
+    return gzip.GzipFile(fileobj=fh) if head == b'\x1f\x8b' else fh
+
+def _detect_format(src, fmt):
+    if fmt and fmt != 'auto': return fmt
+    name = src if isinstance(src, (str, os.PathLike)) else getattr(src, 'name', '')
+    name = str(name).lower().removesuffix('.gz')
+    return 'csv' if name.endswith('.csv') else 'ndjson'
+
+def _chunks(fh, chunk):
+    buf = []
+    for line in fh:
+        buf.append(line)
+        if len(buf) >= chunk: yield buf; buf = []
+    if buf: yield buf
+
+def _bounded_map(pool, jobs, depth):
+    # Executor.map submits everything up front, which would read the whole file; keep `depth` chunks in flight
+    pending = deque()
+    for job in jobs:
+        pending.append(pool.submit(_parse, job))
+        if len(pending) >= depth: yield pending.popleft().result()
+    while pending: yield pending.popleft().result()
+
+def import_file(src, fmt='auto', chunk=200000, workers=None, progress=None, writer=None):
+    """Stream ticks from an NDJSON or CSV file into SQLite (ticks + rollups), one transaction per chunk.
+
+    `workers` > 1 parses chunks on a process pool while the main process inserts; `progress` is
+    called as progress(inserted, skipped) after every chunk. Returns counts and rows per second.
+    """
+    fmt = _detect_format(src, fmt); writer = writer or get_writer()
+    fh = _open(src); header = None
+    if fmt == 'csv':
+        header = [h.strip() for h in next(csv.reader([fh.readline().decode('utf-8', 'ignore')]), [])]
+    inserted = skipped = 0; t0 = time.perf_counter()
+    jobs = ((fmt, lines, header) for lines in _chunks(fh, chunk))
+    pool = ProcessPoolExecutor(workers) if workers and workers > 1 else None
+    try:
+        results = _bounded_map(pool, jobs, 2*workers) if pool else map(_parse, jobs)
+        for rows, bad in results:
+            if rows: inserted += write_batches(writer, rows_to_batches(rows))
+            skipped += bad
+            if progress: progress(inserted, skipped)
+    finally:
+        if pool: pool.shutdown()
+        if isinstance(src, (str, os.PathLike)) or fh is not src: fh.close()
+    invalidate_cache()
+    secs = time.perf_counter() - t0
+    return {'inserted': inserted, 'skipped': skipped, 'seconds': secs, 'rows_per_sec': inserted / secs if secs else 0.0}
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Bulk import NDJSON/CSV ticks into the tick database.')
+    ap.add_argument('files', nargs='+')
+    ap.add_argument('--format', default='auto', choices=['auto', 'ndjson', 'csv'])
+    ap.add_argument('--chunk', type=int, default=200000)
+    ap.add_argument('--workers', type=int, default=os.cpu_count())
+    a = ap.parse_args()
+    for f in a.files:
+        res = import_file(f, a.format, a.chunk, a.workers, progress=lambda n, s: print(f'\r{f}: {n:,} rows, {s:,} skipped', end='', flush=True))
+        print(f"\r{f}: inserted={res['inserted']:,} skipped={res['skipped']:,} in {res['seconds']:.1f}s ({res['rows_per_sec']:,.0f} rows/s)")
@@ -0,0 +1,105 @@
+"""Sharded Binance trade ingestion: several combined-stream sockets, lean decoding, jittered reconnects."""
+import asyncio, json, math, os, random, time
+import websockets
+from .metrics import registry, LAG_BUCKETS
+try:
+    import orjson
+    _loads = orjson.loads
+except Exception:
+    _loads = json.loads
+
+WS_BASE = os.getenv('BINANCE_WS_BASE', 'wss://fstream.binance.com')
+SYMBOLS_PER_SHARD = int(os.getenv('INGEST_SYMBOLS_PER_SHARD', '10'))
+INGEST_LAG = registry.histogram('ingest_lag_ms', 'Receive time minus the payload timestamp (T = trade, E = event), ms', ('stamp',), buckets=LAG_BUCKETS)
+INGEST_MESSAGES = registry.counter('ingest_messages_total', 'Trade messages decoded')
+INGEST_DECODE_ERRORS = registry.counter('ingest_decode_errors_total', 'Frames that failed to decode')
+INGEST_RECONNECTS = registry.counter('ingest_reconnects_total', 'Websocket reconnects across shards')
+INGEST_GAPS = registry.counter('ingest_gaps_total', 'Per-symbol gaps recorded after reconnects')
+
+def shard_symbols(symbols, n_shards=None):
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    if not symbols: return []
+    if n_shards is None: n_shards = math.ceil(len(symbols) / SYMBOLS_PER_SHARD)
+    n_shards = max(1, min(n_shards, len(symbols)))
+    return [symbols[i::n_shards] for i in range(n_shards)]
+
+def stream_uri(symbols, base=WS_BASE):
+    return f"{base}/stream?streams=" + '/'.join(f"{s.lower()}@trade" for s in symbols)
+
+def decode_trade(raw):
+    """Return (symbol, trade_ts, price, qty, event_ts) from a raw trade frame, or None if it is not a trade."""
+    msg = _loads(raw)
+    p = msg.get('data', msg)
+    sym = p.get('s')
+    if sym is None or 'p' not in p: return None
+    ts = p.get('T') or p.get('E') or int(time.time()*1000)
+    return sym, int(ts), float(p['p']), float(p.get('q', 0.0)), int(p.get('E') or ts)
+
+class ShardStream:
+    """One combined-stream connection that reconnects with full-jitter exponential backoff.
+
+    Each reconnect records, per symbol, the last trade ts seen before the drop and the first one
+    after it, so callers can backfill or flag the gap.
+    """
+    def __init__(self, symbols, on_trade, stop_event, base=WS_BASE, backoff_base=0.5, backoff_max=30.0):
+        self.symbols = symbols
+        self.uri = stream_uri(symbols, base)
+        self.on_trade = on_trade
+        self.stop_event = stop_event
+        self.backoff_base = backoff_base; self.backoff_max = backoff_max
+        self.messages = 0; self.decode_errors = 0; self.reconnects = 0
+        self.last_ts = {}
+        self.gaps = []
+        self._pending_gap = set()
+
+    async def run(self):
+        attempt = 0
+        while not self.stop_event.is_set():
+            try:
+                async with websockets.connect(self.uri, ping_interval=20, max_queue=4096) as ws:
+                    attempt = 0
+                    await self._consume(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print('ws error', self.symbols[:3], e)
+            if self.stop_event.is_set(): break
+            self.reconnects += 1; attempt += 1; INGEST_RECONNECTS.inc()
+            self._pending_gap = set(self.last_ts)
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            await asyncio.sleep(delay)
+
+    async def _consume(self, ws):
+        on_trade = self.on_trade; last_ts = self.last_ts; pending = self._pending_gap
+        lag_t = INGEST_LAG.labels('T'); lag_e = INGEST_LAG.labels('E'); msgs = INGEST_MESSAGES.labels(); now = time.time
+        async for raw in ws:
+            try:
+                t = decode_trade(raw)
+            except Exception as e:
+                self.decode_errors += 1; INGEST_DECODE_ERRORS.inc(); print('parse error', e); continue
+            if t is None: continue
+            self.messages += 1; msgs.inc()
+            sym, ts = t[0], t[1]
+            recv = now()*1000; lag_t.observe(recv - ts); lag_e.observe(recv - t[4])
+            if pending and sym in pending:
+                pending.discard(sym)
+                self.gaps.append((sym, last_ts[sym], ts)); INGEST_GAPS.inc()
+            last_ts[sym] = ts
+            on_trade(*t)
+            if self.stop_event.is_set(): break
+
+class IngestManager:
+    def __init__(self, symbols, on_trade, stop_event, n_shards=None, base=WS_BASE):
+        self.shards = [ShardStream(group, on_trade, stop_event, base=base) for group in shard_symbols(symbols, n_shards)]
+
+    async def run(self):
+        for sh in self.shards: print('Connecting to', sh.uri)
+        await asyncio.gather(*(sh.run() for sh in self.shards))
+
+    def gaps(self):
+        return [g for sh in self.shards for g in sh.gaps]
+
+    def stats(self):
+        return {'shards': len(self.shards), 'messages': sum(sh.messages for sh in self.shards),
+                'decode_errors': sum(sh.decode_errors for sh in self.shards),
+                'reconnects': sum(sh.reconnects for sh in self.shards), 'gaps': len(self.gaps())}
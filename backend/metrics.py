@@ -0,0 +1,217 @@
+"""In-process metrics: counters, gauges and histograms (with recent-sample quantiles) and a Prometheus text endpoint.
+
+    from .metrics import registry
+    LAG = registry.histogram('ingest_lag_ms', 'Exchange trade time to receive time', buckets=LAG_BUCKETS)
+    LAG.observe(12.0)
+
+Metrics with labels are used through .labels(*values), which caches the child, so hot paths should keep
+the child around. Gauges can also be computed at scrape time with set_function.
+"""
+import bisect, functools, http.server, math, os, re, threading, time, urllib.request
+
+METRICS_PORT = int(os.getenv('QUANT_METRICS_PORT', '9108'))
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LAG_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+QUANTILES = (0.5, 0.9, 0.99)
+
+def _fmt_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs: return ''
+    return '{' + ','.join(f'{k}="{str(v)}"' for k, v in pairs) + '}'
+
+def _fmt(v):
+    if v == math.inf: return '+Inf'
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class _Value:
+    __slots__ = ('value', '_lock')
+    def __init__(self):
+        self.value = 0.0; self._lock = threading.Lock()
+    def inc(self, n=1.0):
+        with self._lock: self.value += n
+    def dec(self, n=1.0):
+        with self._lock: self.value -= n
+    def set(self, v):
+        self.value = v
+
+class _Hist:
+    """Fixed buckets for the exposition plus a ring of the last `reservoir` samples for quantiles."""
+    __slots__ = ('bounds', 'counts', 'sum', 'count', '_recent', '_i', '_lock')
+    def __init__(self, bounds, reservoir):
+        self.bounds = bounds; self.counts = [0]*(len(bounds) + 1)
+        self.sum = 0.0; self.count = 0
+        self._recent = [0.0]*reservoir; self._i = 0
+        self._lock = threading.Lock()
+
+    def observe(self, v):
+        k = bisect.bisect_left(self.bounds, v)
+        with self._lock:
+            self.counts[k] += 1; self.sum += v; self.count += 1
+            self._recent[self._i % len(self._recent)] = v; self._i += 1
+
+    def quantiles(self, qs=QUANTILES):
+        with self._lock:
+            n = min(self._i, len(self._recent)); xs = sorted(self._recent[:n])
+        if not xs: return {q: math.nan for q in qs}
+        return {q: xs[min(int(q*n), n - 1)] for q in qs}
+
+    def time(self):
+        return _Timer(self)
+
+class _Timer:
+    """Context manager and decorator observing elapsed seconds."""
+    __slots__ = ('hist', 't0')
+    def __init__(self, hist):
+        self.hist = hist
+    def __enter__(self):
+        self.t0 = time.perf_counter(); return self
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0)
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapped(*a, **kw):
+            t0 = time.perf_counter()
+            try: return fn(*a, **kw)
+            finally: self.hist.observe(time.perf_counter() - t0)
+        return wrapped
+
+class Metric:
+    kind = 'untyped'
+    def __init__(self, name, doc, labelnames=()):
+        self.name = name; self.doc = doc; self.labelnames = tuple(labelnames)
+        self._children = {}; self._lock = threading.Lock()
+        self._fn = None
+        if not self.labelnames: self.labels()
+
+    def _new(self):
+        return _Value()
+
+    def labels(self, *values):
+        c = self._children.get(values)
+        if c is None:
+            with self._lock: c = self._children.setdefault(values, self._new())
+        return c
+
+    def set_function(self, fn):
+        """Compute values at scrape time: fn() returns a number, or {label values tuple: number}."""
+        self._fn = fn; return self
+
+    def samples(self):
+        """[(suffix, label values, extra labels, value)] for the exposition."""
+        if self._fn is not None:
+            try: v = self._fn()
+            except Exception: return []
+            items = v.items() if isinstance(v, dict) else [((), v)]
+            return [('', k if isinstance(k, tuple) else (k,), (), val) for k, val in items]
+        return [('', k, (), c.value) for k, c in list(self._children.items())]
+
+class Counter(Metric):
+    kind = 'counter'
+    def inc(self, n=1.0): self.labels().inc(n)
+
+class Gauge(Metric):
+    kind = 'gauge'
+    def set(self, v): self.labels().set(v)
+    def inc(self, n=1.0): self.labels().inc(n)
+    def dec(self, n=1.0): self.labels().dec(n)
+
+class Histogram(Metric):
+    kind = 'histogram'
+    def __init__(self, name, doc, labelnames=(), buckets=LATENCY_BUCKETS, reservoir=2048):
+        self.buckets = tuple(buckets); self.reservoir = reservoir
+        super().__init__(name, doc, labelnames)
+
+    def _new(self):
+        return _Hist(self.buckets, self.reservoir)
+
+    def observe(self, v): self.labels().observe(v)
+    def time(self, *values): return _Timer(self.labels(*values))
+
+    def samples(self):
+        out = []
+        for k, h in list(self._children.items()):
+            acc = 0
+            for b, c in zip(self.buckets + (math.inf,), h.counts):
+                acc += c; out.append(('_bucket', k, (('le', _fmt(b)),), acc))
+            out += [('_sum', k, (), h.sum), ('_count', k, (), h.count)]
+        return out
+
+    def quantile_samples(self):
+        return [(k, q, v) for k, h in list(self._children.items()) for q, v in h.quantiles().items()]
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}; self._lock = threading.Lock()
+
+    def _get(self, cls, name, doc, labelnames, **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None: m = self._metrics[name] = cls(name, doc, labelnames, **kw)
+            return m
+
+    def counter(self, name, doc, labelnames=()): return self._get(Counter, name, doc, labelnames)
+    def gauge(self, name, doc, labelnames=()): return self._get(Gauge, name, doc, labelnames)
+    def histogram(self, name, doc, labelnames=(), buckets=LATENCY_BUCKETS): return self._get(Histogram, name, doc, labelnames, buckets=buckets)
+
+    def exposition(self):
+        """Prometheus text format 0.0.4; histogram quantiles over recent samples go in a <name>_recent gauge family."""
+        lines = []
+        for m in list(self._metrics.values()):
+            lines += [f'# HELP {m.name} {m.doc}', f'# TYPE {m.name} {m.kind}']
+            for suffix, values, extra, v in m.samples():
+                lines.append(f'{m.name}{suffix}{_fmt_labels(m.labelnames, values, extra)} {_fmt(v)}')
+            if isinstance(m, Histogram):
+                lines += [f'# HELP {m.name}_recent {m.doc} (quantiles over the last {m.reservoir} samples)', f'# TYPE {m.name}_recent gauge']
+                for values, q, v in m.quantile_samples():
+                    lines.append(f'{m.name}_recent{_fmt_labels(m.labelnames, values, (("quantile", q),))} {_fmt(v)}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        return parse(self.exposition())
+
+registry = Registry()
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})?\s+(\S+)$')
+_LABEL = re.compile(r'(\w+)="([^"]*)"')
+
+def parse(text):
+    """[(name, {labels}, value)] from Prometheus text, skipping comments and bucket lines."""
+    out = []
+    for line in text.splitlines():
+        if not line or line.startswith('#'): continue
+        m = _SAMPLE.match(line)
+        if not m or m.group(1).endswith('_bucket'): continue
+        out.append((m.group(1), dict(_LABEL.findall(m.group(2) or '')), float(m.group(3))))
+    return out
+
+def scrape(url=f'http://127.0.0.1:{METRICS_PORT}/metrics', timeout=1.0):
+    """Parsed samples from a metrics endpoint (another process), or None when it is not reachable."""
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as r: return parse(r.read().decode())
+    except Exception:
+        return None
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404); return
+        body = registry.exposition().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers(); self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+_server = None
+def start_http_server(port=METRICS_PORT, addr='127.0.0.1'):
+    """Serve /metrics from a daemon thread; returns the server, or None if the port is taken."""
+    global _server
+    if _server is not None: return _server
+    try:
+        _server = http.server.ThreadingHTTPServer((addr, port), _Handler)
+    except OSError as e:
+        print('metrics server error', e); return None
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
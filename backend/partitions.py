@@ -0,0 +1,192 @@
+"""Day-partitioned tick tables (ticks_YYYYMMDD, UTC) and a columnar archive for days past the retention period.
+
+    python -m backend.partitions migrate     # move a pre-partitioning `ticks` table into day partitions
+    python -m backend.partitions compact [--retention-days 7]
+
+Each partition has its own small (symbol, ts) index, so insert cost and recent-range queries do not
+grow with history. Compaction rewrites a whole day, sorted by (symbol, ts), into ARCHIVE_DIR/YYYYMMDD/
+as a Parquet file when pyarrow is installed, else as a directory of .npy columns read with mmap, then
+registers the part in the archive_parts table and drops the partition in one transaction. Readers
+list tables and registered parts in one statement, so every day is seen as exactly one of the two.
+SQLite reuses the freed pages, so the database file stops growing. Rollup bars stay in SQLite.
+"""
+import argparse, json, os, re, sqlite3, time
+from datetime import datetime, timezone
+from itertools import repeat
+import numpy as np
+try:
+    import pyarrow as pa, pyarrow.parquet as pq
+except Exception:
+    pa = pq = None
+
+DAY_MS = 86_400_000
+LEGACY = 'ticks'
+ARCHIVE_DIR = os.path.abspath(os.getenv('QUANT_ARCHIVE_DIR') or os.path.join(os.path.dirname(__file__), '..', 'data_archive'))
+RETENTION_DAYS = int(os.getenv('QUANT_RETENTION_DAYS', '7'))
+LIST_SQL = "SELECT name FROM sqlite_master WHERE type='table' AND (name='ticks' OR name GLOB 'ticks_[0-9]*')"
+# (kind, table name or part path, day_ms) for tables and archive parts, from one snapshot
+SOURCES_SQL = ("SELECT 'table', name, NULL FROM sqlite_master WHERE type='table' AND (name='ticks' OR name GLOB 'ticks_[0-9]*') "
+               "UNION ALL SELECT 'part', path, day FROM archive_parts")
+_NAME = re.compile(r'^ticks_(\d{8})$')
+_known = set()   # partitions this process has already created
+
+def day_start(ts):
+    return int(ts) - int(ts) % DAY_MS
+
+def _day_str(day_ms):
+    return datetime.fromtimestamp(day_ms / 1000, timezone.utc).strftime('%Y%m%d')
+
+def _day_ms(s):
+    return int(datetime.strptime(s, '%Y%m%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def table_name(day_ms):
+    return 'ticks_' + _day_str(day_ms)
+
+def table_day(name):
+    m = _NAME.match(name)
+    return _day_ms(m.group(1)) if m else None
+
+def ensure(cur, day_ms):
+    name = table_name(day_ms)
+    if name not in _known:
+        cur.execute(f'CREATE TABLE IF NOT EXISTS {name} (ts INTEGER, symbol TEXT, price REAL, qty REAL)')
+        cur.execute(f'CREATE INDEX IF NOT EXISTS ix_{name}_symbol_ts ON {name}(symbol, ts)')
+        _known.add(name)
+    return name
+
+def init_tables(cur):
+    cur.execute('CREATE TABLE IF NOT EXISTS archive_parts (day INTEGER, path TEXT PRIMARY KEY, ticks INTEGER)')
+
+def insert(cur, symbol, ts, price, qty):
+    """Insert one symbol's tick arrays into the day partitions they fall in."""
+    days = ts - ts % DAY_MS
+    if (days == days[0]).all(): groups = [(int(days[0]), slice(None))]
+    else: groups = [(int(d), days == d) for d in np.unique(days)]
+    for d, m in groups:
+        name = ensure(cur, d)
+        cur.executemany(f'INSERT INTO {name} (ts,symbol,price,qty) VALUES (?,?,?,?)',
+                        zip(ts[m].tolist(), repeat(symbol), price[m].tolist(), qty[m].tolist()))
+
+def list_tables(conn):
+    """(day_ms, name) for every partition table, oldest first; the legacy table is not included."""
+    out = [(table_day(r[0]), r[0]) for r in conn.execute(LIST_SQL) if r[0] != LEGACY]
+    return sorted(out)
+
+def count(conn):
+    """Ticks across partitions and the legacy table."""
+    return sum(conn.execute(f'SELECT COUNT(*) FROM {r[0]}').fetchone()[0] for r in conn.execute(LIST_SQL).fetchall())
+
+def _parts(day_dir):
+    return sorted(os.path.join(day_dir, p) for p in os.listdir(day_dir) if p.startswith('part-') and not p.endswith('.tmp'))
+
+def write_part(day_dir, symbols, ts, price, qty):
+    """Write one archive part from column arrays sorted by (symbol, ts); `symbols` holds each row's symbol."""
+    os.makedirs(day_dir, exist_ok=True)
+    k = len(_parts(day_dir)) + len([p for p in os.listdir(day_dir) if p.endswith('.tmp')])
+    path = os.path.join(day_dir, f'part-{k:04d}' + ('.parquet' if pq is not None else ''))
+    tmp = path + '.tmp'
+    if pq is not None:
+        pq.write_table(pa.table({'symbol': symbols, 'ts': ts, 'price': price, 'qty': qty}), tmp, compression='zstd', row_group_size=1 << 20)
+    else:
+        names = sorted(set(symbols)); code = {s: i for i, s in enumerate(names)}
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, 'sym.npy'), np.fromiter((code[s] for s in symbols), 'int32', len(symbols)))
+        for col, arr in (('ts', ts), ('price', price), ('qty', qty)): np.save(os.path.join(tmp, f'{col}.npy'), arr)
+        with open(os.path.join(tmp, 'symbols.json'), 'w') as fh: json.dump(names, fh)
+    os.replace(tmp, path)
+    return path
+
+def _read_part(path, symbol, start, end):
+    if path.endswith('.parquet'):
+        if pq is None: return None
+        filters = [('symbol', '=', symbol)]
+        if start is not None: filters.append(('ts', '>=', start))
+        if end is not None: filters.append(('ts', '<=', end))
+        t = pq.read_table(path, columns=['ts', 'price', 'qty'], filters=filters)
+        return t['ts'].to_numpy(), t['price'].to_numpy(), t['qty'].to_numpy()
+    with open(os.path.join(path, 'symbols.json')) as fh: names = json.load(fh)
+    if symbol not in names: return None
+    code = names.index(symbol)
+    sym = np.load(os.path.join(path, 'sym.npy'), mmap_mode='r')
+    lo, hi = np.searchsorted(sym, code, 'left'), np.searchsorted(sym, code, 'right')
+    ts = np.load(os.path.join(path, 'ts.npy'), mmap_mode='r')[lo:hi]
+    a = 0 if start is None else np.searchsorted(ts, start, 'left')
+    b = len(ts) if end is None else np.searchsorted(ts, end, 'right')
+    price = np.load(os.path.join(path, 'price.npy'), mmap_mode='r')[lo:hi]
+    qty = np.load(os.path.join(path, 'qty.npy'), mmap_mode='r')[lo:hi]
+    return np.array(ts[a:b]), np.array(price[a:b]), np.array(qty[a:b])
+
+def read_parts(paths, symbol, start=None, end=None):
+    """(ts, price, qty) arrays for symbol from archive parts, in time order."""
+    got = [r for r in (_read_part(p, symbol, start, end) for p in paths) if r is not None and len(r[0])]
+    if not got: return np.empty(0, 'int64'), np.empty(0), np.empty(0)
+    if len(got) == 1: return got[0]
+    ts, price, qty = (np.concatenate([g[k] for g in got]) for k in range(3))
+    order = np.argsort(ts, kind='stable')
+    return ts[order], price[order], qty[order]
+
+def _day_rows(conn, name, after=0):
+    """Columns of partition rows with rowid > after, sorted by (symbol, ts), and the highest rowid seen."""
+    rows = conn.execute(f'SELECT symbol, ts, price, qty, rowid FROM {name} WHERE rowid > ? ORDER BY symbol, ts, rowid', (after,)).fetchall()
+    if not rows: return None, after
+    syms, ts, price, qty, rowid = zip(*rows)
+    return (list(syms), np.asarray(ts, 'int64'), np.asarray(price, 'float64'), np.asarray(qty, 'float64')), max(rowid)
+
+def compact(writer, retention_days=RETENTION_DAYS, directory=ARCHIVE_DIR, now_ms=None):
+    """Archive and drop partitions older than retention_days (0 disables); returns [(table, ticks)].
+
+    Each day is read on a separate connection and written out without holding the writer lock. A
+    short write transaction then archives any ticks that landed meanwhile as a second small part,
+    registers the parts and drops the table. Ticks arriving later for that day go to a fresh
+    partition, which a later pass archives as another part.
+    """
+    if not retention_days: return []
+    cutoff = day_start(now_ms if now_ms is not None else time.time() * 1000) - retention_days * DAY_MS
+    done = []
+    with writer.transaction() as cur:
+        init_tables(cur)
+        old = [(d, n) for d, n in list_tables(cur) if d < cutoff]
+    if not old: return done
+    conn = sqlite3.connect(writer.path)
+    try:
+        for day, name in old:
+            day_dir = os.path.join(directory, _day_str(day))
+            cols, last = _day_rows(conn, name)
+            parts = [(write_part(day_dir, *cols), len(cols[1]))] if cols else []
+            with writer.transaction() as cur:
+                cols, _ = _day_rows(cur, name, last)
+                if cols: parts.append((write_part(day_dir, *cols), len(cols[1])))
+                cur.executemany('INSERT INTO archive_parts (day, path, ticks) VALUES (?,?,?)', [(day, p, n) for p, n in parts])
+                cur.execute(f'DROP TABLE {name}'); _known.discard(name)
+            done.append((name, sum(n for _, n in parts)))
+    finally:
+        conn.close()
+    return done
+
+def migrate_legacy(writer, chunk=500000):
+    """Move rows of the pre-partitioning `ticks` table into day partitions, chunk by chunk, then drop it."""
+    total = 0; last = -1
+    while True:
+        with writer.transaction() as cur:
+            if not cur.execute(f"SELECT 1 FROM sqlite_master WHERE type='table' AND name='{LEGACY}'").fetchone(): return total
+            rows = cur.execute(f'SELECT id, ts, symbol, price, qty FROM {LEGACY} WHERE id > ? ORDER BY id LIMIT ?', (last, chunk)).fetchall()
+            if not rows:
+                cur.execute(f'DROP TABLE {LEGACY}'); return total
+            by_day = {}
+            for _, ts, sym, price, qty in rows: by_day.setdefault(day_start(ts), []).append((ts, sym, price, qty))
+            for day, rs in by_day.items():
+                cur.executemany(f'INSERT INTO {ensure(cur, day)} (ts,symbol,price,qty) VALUES (?,?,?,?)', rs)
+            last = rows[-1][0]
+            cur.execute(f'DELETE FROM {LEGACY} WHERE id <= ?', (last,))
+            total += len(rows)
+
+if __name__ == '__main__':
+    from .sqlite_io import get_writer
+    ap = argparse.ArgumentParser(description='Maintain day-partitioned tick storage.')
+    ap.add_argument('command', choices=['migrate', 'compact'])
+    ap.add_argument('--retention-days', type=int, default=RETENTION_DAYS)
+    a = ap.parse_args()
+    if a.command == 'migrate':
+        print('migrated', migrate_legacy(get_writer()), 'ticks into day partitions')
+    else:
+        for name, n in compact(get_writer(), a.retention_days): print(f'archived {name}: {n:,} ticks')
@@ -1,10 +1,14 @@
 """Realtime backend streamer: connects to Binance futures, buffers ticks, persists to SQLite."""
-import asyncio, json, sqlite3, time, threading, os
-from collections import defaultdict, deque
-import websockets
+import asyncio, time, threading, os
+from .bars import bar_aggregator
+from .sqlite_io import get_writer
+from .ringbuffer import TickStore
+from . import partitions, rollups
+from .ingest import IngestManager, WS_BASE
+from .shm_feed import FeedWriter
+from .metrics import registry, start_http_server
+from .sinks import SEGMENT_DIR, FileSink, MongoSink, SinkHub, SQLiteSink
 
-BASE = os.path.dirname(__file__)
-DBPATH = os.path.join(BASE, '..', 'data_ticks.db')
 try:
     from pymongo import MongoClient
 except Exception:
@@ -28,85 +32,105 @@ def init_mongo():
         print('mongo init error', e)
 
 def init_db():
-    conn = sqlite3.connect(DBPATH)
-    cur = conn.cursor()
-    cur.execute('''CREATE TABLE IF NOT EXISTS ticks (id INTEGER PRIMARY KEY, ts INTEGER, symbol TEXT, price REAL, qty REAL)''')
-    cur.execute('CREATE INDEX IF NOT EXISTS ix_ticks_symbol_ts ON ticks(symbol, ts)')
-    conn.commit(); conn.close()
+    writer = get_writer()
+    # ticks go to day partitions created on first write; a pre-partitioning `ticks` table is still read
+    # (python -m backend.partitions migrate moves it over)
+    with writer.transaction() as cur:
+        created = rollups.init_tables(cur); partitions.init_tables(cur)
+        legacy = cur.execute(f"SELECT 1 FROM sqlite_master WHERE type='table' AND name='{partitions.LEGACY}'").fetchone() is not None
+        backfill = bool(created) and legacy and cur.execute('SELECT 1 FROM ticks LIMIT 1').fetchone() is not None
+    if backfill:
+        print('building rollup bars from existing ticks...')
+        print('rollups backfilled from', rollups.rebuild(writer), 'ticks')
 
 init_db()
 init_mongo()
 
 BUFFER_MAX = 200000
-tick_storage = defaultdict(lambda: deque(maxlen=BUFFER_MAX))
+tick_storage = TickStore(BUFFER_MAX)
+RING_DEPTH = registry.gauge('ring_depth_ticks', 'Ticks buffered per symbol awaiting persistence', ('symbol',)).set_function(
+    lambda: {(s,): n for s, n in tick_storage.counts().items()})
+RING_OVERFLOW = registry.counter('ring_overflow_ticks_total', 'Ticks dropped because a ring buffer wrapped before it was drained', ('symbol',)).set_function(
+    lambda: {(s,): n for s, n in tick_storage.overflow().items()})
+LATE_TICKS = registry.counter('bar_late_ticks_total', 'Ticks older than every open bar').set_function(lambda: bar_aggregator.late_ticks)
+# only the drain and enqueue: durable write latency is sink_write_seconds, per sink
+PERSIST_HANDOFF_SECONDS = registry.histogram('persist_handoff_seconds', 'Ring drain and hand-off to the sink queues per persist pass')
+PERSIST_TICKS = registry.counter('persist_ticks_total', 'Ticks drained from the rings and handed to sinks')
+PERSIST_ERRORS = registry.counter('persist_errors_total', 'Failed persist passes')
+
+def build_sinks():
+    # SQLite always; Mongo when configured; file segments when QUANT_SEGMENT_DIR is set
+    hub = SinkHub([SQLiteSink(get_writer())])
+    if mongo_col is not None: hub.add(MongoSink(mongo_col))
+    if SEGMENT_DIR: hub.add(FileSink(SEGMENT_DIR))
+    return hub
+
+sink_hub = build_sinks()
 stop_event = threading.Event()
 _runner_thread = None
 _persist_thread = None
 _loop = None
+ingest = None
+
+feed = None
+
+def _on_trade(sym, ts, price, qty, event_ts):
+    tick_storage[sym].append(ts, price, qty)
+    bar_aggregator.update(sym, ts, price, qty)
+    if feed is not None: feed.publish_tick(sym, ts, price, qty)
+
+async def _stream_symbols(symbols, n_shards=None, base=WS_BASE):
+    global ingest
+    ingest = IngestManager(symbols, _on_trade, stop_event, n_shards=n_shards, base=base)
+    await ingest.run()
 
-async def _stream_symbols(symbols):
-    streams = '/'.join(f"{s.lower()}@trade" for s in symbols)
-    uri = f"wss://fstream.binance.com/stream?streams={streams}"
-    print('Connecting to', uri)
-    async with websockets.connect(uri, ping_interval=20) as ws:
-        async for raw in ws:
-            try:
-                msg = json.loads(raw)
-                payload = msg.get('data', msg)
-                sym = payload.get('s')
-                price = float(payload.get('p', 0.0))
-                qty = float(payload.get('q', 0.0))
-                ts = int(payload.get('T') or payload.get('E') or int(time.time()*1000))
-                tick = {'timestamp': ts, 'symbol': sym, 'price': price, 'qty': qty}
-                tick_storage[sym].append(tick)
-            except Exception as e:
-                print('parse error', e)
-            if stop_event.is_set():
-                break
+def persist_once(store=None):
+    """Drain every ring of `store` (default tick_storage) and queue the batch on each sink; returns ticks drained.
+
+    Writes happen on the sinks' own threads, so a slow sink never holds up draining or the other sinks.
+    """
+    t0 = time.perf_counter()
+    batches = {sym: ring.drain() for sym, ring in (tick_storage if store is None else store).items()}
+    batches = {sym: b for sym, b in batches.items() if len(b[0])}
+    if not batches: return 0
+    sink_hub.start()
+    sink_hub.submit(batches)
+    n = sum(len(b[0]) for b in batches.values())
+    PERSIST_HANDOFF_SECONDS.observe(time.perf_counter() - t0); PERSIST_TICKS.inc(n)
+    return n
 
 def persist_loop(interval=5):
     while not stop_event.is_set():
         try:
-            conn = sqlite3.connect(DBPATH)
-            cur = conn.cursor()
-            # move from buffer to DB
-            for sym, dq in list(tick_storage.items()):
-                rows = []
-                docs = []
-                while dq:
-                    t = dq.popleft()
-                    rows.append((int(t['timestamp']), t['symbol'], float(t['price']), float(t['qty'])))
-                    docs.append({'ts': int(t['timestamp']), 'symbol': t['symbol'], 'price': float(t['price']), 'qty': float(t['qty'])})
-                    if len(rows) >= 500:
-                        cur.executemany('INSERT INTO ticks (ts,symbol,price,qty) VALUES (?,?,?,?)', rows)
-                        conn.commit(); rows = []
-                        if mongo_col is not None and docs:
-                            try:
-                                mongo_col.insert_many(docs, ordered=False)
-                            except Exception as me:
-                                print('mongo insert error', me)
-                            docs = []
-                if rows:
-                    cur.executemany('INSERT INTO ticks (ts,symbol,price,qty) VALUES (?,?,?,?)', rows)
-                    conn.commit()
-                if mongo_col is not None and docs:
-                    try:
-                        mongo_col.insert_many(docs, ordered=False)
-                    except Exception as me:
-                        print('mongo insert error', me)
-            conn.close()
+            persist_once()
+        except Exception as e:
+            PERSIST_ERRORS.inc(); print('persist error', e)
+        stop_event.wait(interval)
+    try: persist_once()
+    except Exception as e: print('persist error', e)
+
+def compact_loop(interval=3600):
+    # archive day partitions past the retention period (QUANT_RETENTION_DAYS, 0 disables)
+    if stop_event.wait(60): return  # let ingest settle first
+    while True:
+        try:
+            for name, n in partitions.compact(get_writer()): print(f'archived {name}: {n} ticks')
         except Exception as e:
-            print('persist error', e)
-        time.sleep(interval)
+            print('compaction error', e)
+        if stop_event.wait(interval): return
 
-def start_background_stream(symbols=None):
+def start_background_stream(symbols=None, publish_feed=False):
     if symbols is None:
         symbols = ['BTCUSDT','ETHUSDT']
-    global _runner_thread, _persist_thread, _loop
+    global _runner_thread, _persist_thread, _loop, feed
     if _runner_thread and _runner_thread.is_alive():
         print('Streamer already running')
         return
     stop_event.clear()
+    start_http_server()
+    if publish_feed and feed is None:
+        # ticks for readers in other processes (the Streamlit frontend), which rebuild bars from them
+        feed = FeedWriter()
     def runner():
         global _loop
         loop = asyncio.new_event_loop()
@@ -115,12 +139,13 @@ def start_background_stream(symbols=None):
         loop.run_until_complete(_stream_symbols(symbols))
     _persist_thread = threading.Thread(target=persist_loop, daemon=True)
     _persist_thread.start()
+    threading.Thread(target=compact_loop, daemon=True).start()
     _runner_thread = threading.Thread(target=runner, daemon=True)
     _runner_thread.start()
     print('Background streamer started for', symbols)
 
 def stop_background_stream(timeout=5):
-    global _runner_thread, _persist_thread, _loop
+    global _runner_thread, _persist_thread, _loop, feed
     if not (_runner_thread and _runner_thread.is_alive()):
         stop_event.set()
         return
@@ -134,12 +159,16 @@ def stop_background_stream(timeout=5):
         _persist_thread.join(timeout=timeout)
     if _runner_thread:
         _runner_thread.join(timeout=timeout)
+    sink_hub.stop(timeout)
+    if feed is not None:
+        # removing the segment tells readers in other processes the live feed is gone
+        writer, feed = feed, None; writer.close()
     _runner_thread = None
     _persist_thread = None
     _loop = None
     print('Background streamer stopped')
 
 if __name__ == '__main__':
-    start_background_stream(['BTCUSDT','ETHUSDT'])
+    start_background_stream(['BTCUSDT','ETHUSDT'], publish_feed=True)
     while True:
         time.sleep(1)
@@ -0,0 +1,175 @@
+"""Deterministic tick replay through the live path: ring buffers -> persist -> bars -> alerts -> get_resampled -> analytics.
+
+    python -m backend.replay ticks.ndjson --speed 10
+    python -m backend.replay --stored BTCUSDT ETHUSDT --start 2024-01-01 --max-speed
+
+Ticks are stable-sorted by timestamp and handed to the sinks at fixed intervals of *tick* time, so the
+same input always produces the same bars, stored ticks and alert sequence regardless of replay speed.
+"""
+import argparse, csv, json, os, threading, time
+import numpy as np
+from . import real_backend
+from .alerts import AlertEngine, engine as alert_engine
+from .analytics import compute_hedge_ratio_ols, compute_spread_zscore, rolling_correlation
+from .bars import BarAggregator
+from .importer import _chunks, _detect_format, _open, parse_csv, parse_ndjson
+from .ringbuffer import TickStore
+from .storage import get_range, get_resampled
+
+def _tape(rows):
+    """(ts, symbol, price, qty) arrays stable-sorted by ts from (ts, symbol, price, qty) rows."""
+    if not rows: return np.empty(0, 'int64'), np.empty(0, object), np.empty(0), np.empty(0)
+    ts, sym, price, qty = zip(*rows)
+    ts = np.asarray(ts, 'int64'); order = np.argsort(ts, kind='stable')
+    return ts[order], np.asarray(sym, object)[order], np.asarray(price, 'float64')[order], np.asarray(qty, 'float64')[order]
+
+def load_ticks(src, fmt='auto'):
+    """Ticks from an NDJSON or CSV path or file object, in the importer's formats."""
+    if hasattr(src, 'seek'): src.seek(0)  # an uploaded file the importer already read
+    fmt = _detect_format(src, fmt); fh = _open(src); rows = []
+    header = [h.strip() for h in next(csv.reader([fh.readline().decode('utf-8', 'ignore')]), [])] if fmt == 'csv' else None
+    for lines in _chunks(fh, 100000):
+        rows += (parse_csv(lines, header) if fmt == 'csv' else parse_ndjson(lines))[0]
+    if isinstance(src, (str, os.PathLike)) or fh is not src: fh.close()
+    return _tape(rows)
+
+def stored_ticks(symbols, start=None, end=None):
+    """Ticks already in the database for symbols between start and end."""
+    rows = []
+    for s in symbols:
+        df = get_range(s, start, end)
+        if not df.empty: rows += zip(df['ts'].tolist(), [s]*len(df), df['price'].tolist(), df['qty'].tolist())
+    return _tape(rows)
+
+def synthetic_ticks(symbols, n=100000, step_ms=50, seed=0):
+    """Random-walk ticks for symbols, round-robin, step_ms apart (benchmarks and demos)."""
+    rng = np.random.default_rng(seed)
+    k = len(symbols); ts = 1_700_000_000_000 + np.arange(n, dtype='int64')*step_ms
+    sym = np.asarray(symbols, object)[np.arange(n) % k]
+    steps = rng.normal(0, 1e-4, n); price = np.empty(n)
+    for i in range(k):
+        price[i::k] = (100.0 + 10*i)*np.exp(np.cumsum(steps[i::k]))
+    return ts, sym, price, rng.random(n)
+
+class TickReplayer:
+    """Feeds a tick tape through the backend at `speed` x real time (None = as fast as possible).
+
+    The replay has its own ring buffers, bar aggregator and alert engine (a copy of the live alerts),
+    so it never touches live ticks or bars and can run while the stream does. Every `persist_ms` of
+    tick time its rings are drained by persist_once into the shared sinks (or discarded when
+    persist=False, e.g. for ticks that are already stored), and the sinks are flushed before
+    analytics run on get_resampled bars. Closed bars are evaluated in the replay thread, so triggers
+    are reproducible.
+    """
+    def __init__(self, tape, speed=None, persist=True, persist_ms=5000, timeframe='1Min', window=30):
+        self.ts, self.sym, self.price, self.qty = tape
+        self.speed = speed; self.persist = persist; self.persist_ms = persist_ms
+        self.timeframe = timeframe; self.window = window
+        self.store = TickStore(real_backend.BUFFER_MAX); self.bars = BarAggregator()
+        self.alerts = AlertEngine(on_trigger=self._on_alert, seed=False)
+        for a in list(alert_engine.alerts.values()): self.alerts.add(a)
+        self._stop = threading.Event(); self._thread = None
+        self.done = 0; self.persisted = 0; self.handoff_secs = []
+        self.alerts_fired = 0; self.analytics = {}; self.timings = {}
+        self.error = None; self.finished = False
+
+    def __len__(self):
+        return len(self.ts)
+
+    def _on_bar(self, symbol, tf, bar):
+        if self.alerts.watching(symbol, tf): self.alerts.process(symbol, tf, bar[0], bar[4])
+
+    def _on_alert(self, ev):
+        self.alerts_fired += 1
+
+    def _on_trade(self, sym, ts, price, qty):
+        self.store[sym].append(ts, price, qty)
+        self.bars.update(sym, ts, price, qty)
+
+    def _persist(self):
+        t0 = time.perf_counter()
+        if self.persist:
+            self.persisted += real_backend.persist_once(self.store)
+        else:
+            for _, ring in self.store.items(): ring.drain()
+        self.handoff_secs.append(time.perf_counter() - t0)
+
+    def run(self):
+        """Replay the whole tape in the calling thread; returns stats()."""
+        self.bars.subscribe(self._on_bar)
+        on_trade = self._on_trade
+        t_start = time.perf_counter()
+        try:
+            if len(self.ts):
+                ts0 = int(self.ts[0]); next_persist = ts0 + self.persist_ms; w0 = time.perf_counter()
+                for t, s, p, q in zip(self.ts.tolist(), self.sym.tolist(), self.price.tolist(), self.qty.tolist()):
+                    if self._stop.is_set(): break
+                    if self.speed:
+                        wait = (t - ts0) / 1000.0 / self.speed - (time.perf_counter() - w0)
+                        if wait > 0: time.sleep(wait)
+                    if t >= next_persist:
+                        self._persist(); next_persist = t - (t - ts0) % self.persist_ms + self.persist_ms
+                    on_trade(s, t, p, q)
+                    self.done += 1
+                self._persist()
+                if self.persist:
+                    # hand-offs return before the sinks write; this is the wait for the tail to be durable
+                    t0 = time.perf_counter(); real_backend.sink_hub.flush()
+                    self.timings['flush_ms'] = 1000*(time.perf_counter() - t0)
+            self.timings['replay_secs'] = time.perf_counter() - t_start
+            self._run_analytics()
+        except Exception as e:
+            self.error = str(e); print('replay error', e)
+        finally:
+            self.bars.unsubscribe(self._on_bar)
+            self.finished = True
+        return self.stats()
+
+    def _run_analytics(self):
+        syms = list(dict.fromkeys(self.sym.tolist()))
+        frames = {}
+        for s in syms:
+            t0 = time.perf_counter(); frames[s] = get_resampled(s, self.timeframe)
+            self.timings[f'get_resampled_{s}_ms'] = 1000*(time.perf_counter() - t0)
+        if len(syms) >= 2 and not frames[syms[0]].empty and not frames[syms[1]].empty:
+            a, b = frames[syms[0]], frames[syms[1]]
+            t0 = time.perf_counter(); hr = compute_hedge_ratio_ols(a, b)['hedge_ratio']
+            spread, z = compute_spread_zscore(a, b, hedge_ratio=hr, window=self.window)
+            rc = rolling_correlation(a, b, window=self.window)
+            self.timings['analytics_ms'] = 1000*(time.perf_counter() - t0)
+            zz = z.dropna(); cc = rc.dropna()
+            self.analytics = {'pair': f'{syms[0]}/{syms[1]}', 'bars': len(spread), 'hedge_ratio': float(hr),
+                              'last_z': float(zz.iloc[-1]) if len(zz) else None, 'last_corr': float(cc.iloc[-1]) if len(cc) else None}
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, daemon=True); self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        ps = np.asarray(self.handoff_secs)*1000 if self.handoff_secs else np.zeros(1)
+        secs = self.timings.get('replay_secs', 0.0)
+        return {'ticks': len(self), 'replayed': self.done, 'persisted': self.persisted, 'speed': self.speed,
+                'ticks_per_sec': self.done / secs if secs else 0.0, 'persist_batches': len(self.handoff_secs),
+                'handoff_ms_p50': float(np.percentile(ps, 50)), 'handoff_ms_p99': float(np.percentile(ps, 99)),
+                'sinks': real_backend.sink_hub.stats() if self.persist else [], 'alerts_fired': self.alerts_fired, 'analytics': self.analytics, 'timings': dict(self.timings),
+                'late_ticks': self.bars.late_ticks, 'finished': self.finished, 'error': self.error}
+
+def replay(tape, speed=None, **kw):
+    """Replay a tape synchronously and return its stats."""
+    return TickReplayer(tape, speed=speed, **kw).run()
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Replay ticks through the ingestion, storage, analytics and alert path.')
+    ap.add_argument('file', nargs='?')
+    ap.add_argument('--stored', nargs='+', help='replay stored ticks for these symbols instead of a file (not re-persisted)')
+    ap.add_argument('--start'); ap.add_argument('--end')
+    ap.add_argument('--speed', type=float, default=1.0)
+    ap.add_argument('--max-speed', action='store_true')
+    ap.add_argument('--timeframe', default='1Min')
+    a = ap.parse_args()
+    tape = stored_ticks(a.stored, a.start, a.end) if a.stored else load_ticks(a.file)
+    print(json.dumps(replay(tape, None if a.max_speed else a.speed, persist=not a.stored, timeframe=a.timeframe), indent=2, default=str))
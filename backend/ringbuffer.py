@@ -0,0 +1,123 @@
+"""Per-symbol tick ring buffers: preallocated int64/float64 columns with a write cursor."""
+import threading
+import numpy as np
+
+class TickRing:
+    """Fixed-capacity struct-of-arrays ring of (ts, price, qty).
+
+    `head` counts every tick ever written and `tail` marks how far persist has drained.
+    When the writer laps undrained ticks the oldest are overwritten and counted in `overflow`.
+    """
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.ts = np.zeros(self.capacity, dtype='int64')
+        self.price = np.zeros(self.capacity, dtype='float64')
+        self.qty = np.zeros(self.capacity, dtype='float64')
+        self.head = 0
+        self.tail = 0
+        self.overflow = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.head - self.tail
+
+    @property
+    def nbytes(self):
+        return self.ts.nbytes + self.price.nbytes + self.qty.nbytes
+
+    def append(self, ts, price, qty):
+        with self._lock:
+            if self.head - self.tail >= self.capacity:
+                self.tail += 1; self.overflow += 1
+            i = self.head % self.capacity
+            self.ts[i] = ts; self.price[i] = price; self.qty[i] = qty
+            self.head += 1
+
+    def extend(self, ts, price, qty):
+        ts = np.asarray(ts, dtype='int64'); price = np.asarray(price, dtype='float64'); qty = np.asarray(qty, dtype='float64')
+        n = len(ts)
+        if n > self.capacity:
+            dropped = n - self.capacity
+            ts, price, qty = ts[dropped:], price[dropped:], qty[dropped:]
+        else:
+            dropped = 0
+        with self._lock:
+            self.head += dropped  # skipped ticks count as overflow through the lap check below
+            for a, b in self._spans(self.head, self.head + len(ts)):
+                i = a % self.capacity; j = i + (b - a); k = a - self.head
+                self.ts[i:j] = ts[k:k + b - a]; self.price[i:j] = price[k:k + b - a]; self.qty[i:j] = qty[k:k + b - a]
+            self.head += len(ts)
+            over = self.head - self.tail - self.capacity
+            if over > 0: self.tail += over; self.overflow += over
+
+    def _spans(self, lo, hi):
+        """Split absolute positions [lo, hi) into at most two physically contiguous spans."""
+        if hi <= lo: return []
+        cut = (lo // self.capacity + 1) * self.capacity
+        return [(lo, hi)] if hi <= cut else [(lo, cut), (cut, hi)]
+
+    def segments(self, n=None):
+        """Zero-copy views of the latest n ticks as up to two (ts, price, qty) chunks, oldest first.
+
+        Views alias the ring, so copy them if they must outlive the next `capacity` appends.
+        """
+        hi = self.head
+        lo = max(hi - self.capacity, 0) if n is None else max(hi - min(n, self.capacity), 0)
+        out = []
+        for a, b in self._spans(lo, hi):
+            i = a % self.capacity; j = i + (b - a)
+            out.append((self.ts[i:j], self.price[i:j], self.qty[i:j]))
+        return out
+
+    def latest(self, n=None):
+        """Latest n ticks as contiguous arrays; zero-copy unless the range wraps."""
+        segs = self.segments(n)
+        if not segs: return np.empty(0, 'int64'), np.empty(0, 'float64'), np.empty(0, 'float64')
+        if len(segs) == 1: return segs[0]
+        return tuple(np.concatenate([s[k] for s in segs]) for k in range(3))
+
+    def drain(self):
+        """Copy out every undrained tick and advance the tail."""
+        with self._lock:
+            segs = []
+            for a, b in self._spans(self.tail, self.head):
+                i = a % self.capacity; j = i + (b - a)
+                segs.append((self.ts[i:j], self.price[i:j], self.qty[i:j]))
+            self.tail = self.head
+            if not segs: return np.empty(0, 'int64'), np.empty(0, 'float64'), np.empty(0, 'float64')
+            return tuple(np.concatenate([s[k] for s in segs]) for k in range(3))
+
+class TickStore:
+    """Symbol -> TickRing map, creating rings on first use (dict-like for existing callers)."""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, symbol):
+        ring = self._rings.get(symbol)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(symbol, TickRing(self.capacity))
+        return ring
+
+    def __contains__(self, symbol):
+        return symbol in self._rings
+
+    def get(self, symbol, default=None):
+        return self._rings.get(symbol, default)
+
+    def items(self):
+        return list(self._rings.items())
+
+    def keys(self):
+        return list(self._rings)
+
+    def counts(self):
+        return {s: len(r) for s, r in self._rings.items()}
+
+    def overflow(self):
+        return {s: r.overflow for s, r in self._rings.items()}
+
+    def nbytes(self):
+        return sum(r.nbytes for r in self._rings.values())
@@ -0,0 +1,148 @@
+"""Rolling mean/variance/covariance: O(1) incremental updates and vectorized multi-window batch passes."""
+import math
+from collections import deque
+import numpy as np
+
+def _window_sums(c, w):
+    # c is a cumulative sum with a leading 0; returns the sum of each trailing window, NaN-padded to len(c)-1
+    out = np.full(len(c) - 1, np.nan)
+    if w <= len(out): out[w-1:] = c[w:] - c[:-w]
+    return out
+
+def _cumsum0(v):
+    return np.concatenate([[0.0], np.cumsum(v)])
+
+def _centred(x, bad):
+    # x minus its mean over valid entries, with invalid entries zeroed so they do not poison the cumsums
+    ref = x[~bad].mean() if not bad.all() else 0.0
+    return np.where(bad, 0.0, x - ref), ref
+
+def rolling_mean_std(x, windows):
+    """{window: (mean, std)} for every window in one pass over x (sample std, NaN until the window fills).
+
+    Values are centred on their mean before the cumulative sums so long series do not lose precision
+    to cancellation in sum(x^2) - sum(x)^2/n. As with pandas' rolling(window), only windows that
+    contain a NaN come out NaN.
+    """
+    x = np.asarray(x, dtype='float64')
+    if len(x) == 0: return {w: (np.empty(0), np.empty(0)) for w in windows}
+    bad = np.isnan(x); d, ref = _centred(x, bad)
+    c1 = _cumsum0(d); c2 = _cumsum0(d*d); cn = _cumsum0(bad) if bad.any() else None
+    out = {}
+    for w in windows:
+        s1 = _window_sums(c1, w); s2 = _window_sums(c2, w)
+        mean = s1 / w
+        var = np.maximum(s2 - s1*mean, 0.0) / (w - 1) if w > 1 else np.full_like(s1, np.nan)
+        if cn is not None:
+            hole = _window_sums(cn, w) > 0; mean[hole] = np.nan; var[hole] = np.nan
+        out[w] = (mean + ref, np.sqrt(var))
+    return out
+
+def rolling_zscores(x, windows):
+    """{window: z} where z = (x - rolling mean) / rolling std, matching pandas' rolling(window)."""
+    x = np.asarray(x, dtype='float64')
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {w: (x - m) / s for w, (m, s) in rolling_mean_std(x, windows).items()}
+
+def rolling_corrs(x, y, windows):
+    """{window: Pearson correlation of x and y over each trailing window}; NaN where either has a NaN in the window."""
+    x = np.asarray(x, dtype='float64'); y = np.asarray(y, dtype='float64')
+    if len(x) == 0: return {w: np.empty(0) for w in windows}
+    bad = np.isnan(x) | np.isnan(y)
+    dx, _ = _centred(x, bad); dy, _ = _centred(y, bad)
+    cx = _cumsum0(dx); cy = _cumsum0(dy)
+    cxx = _cumsum0(dx*dx); cyy = _cumsum0(dy*dy); cxy = _cumsum0(dx*dy)
+    cn = _cumsum0(bad) if bad.any() else None
+    out = {}
+    for w in windows:
+        sx, sy = _window_sums(cx, w), _window_sums(cy, w)
+        vxx = np.maximum(_window_sums(cxx, w) - sx*sx/w, 0.0)
+        vyy = np.maximum(_window_sums(cyy, w) - sy*sy/w, 0.0)
+        cov = _window_sums(cxy, w) - sx*sy/w
+        den = np.sqrt(vxx*vyy)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r = np.where(den > 0, cov / den, np.nan)
+        if cn is not None: r[_window_sums(cn, w) > 0] = np.nan
+        out[w] = r
+    return out
+
+class RollingCov:
+    """Sliding-window Welford co-moments of (x, y): O(1) per update, periodically re-centred to stop drift."""
+    RECOMPUTE_EVERY = 10000
+    def __init__(self, window):
+        self.window = int(window)
+        self.values = deque()
+        self.n = 0; self.mx = 0.0; self.my = 0.0; self.cxx = 0.0; self.cyy = 0.0; self.cxy = 0.0
+        self._updates = 0
+
+    def _add(self, x, y):
+        self.n += 1
+        dx = x - self.mx; dy = y - self.my
+        self.mx += dx / self.n; self.my += dy / self.n
+        self.cxx += dx*(x - self.mx); self.cyy += dy*(y - self.my); self.cxy += dx*(y - self.my)
+
+    def _remove(self, x, y):
+        self.n -= 1
+        if self.n == 0:
+            self.mx = self.my = self.cxx = self.cyy = self.cxy = 0.0; return
+        dx = x - self.mx; dy = y - self.my
+        self.mx -= dx / self.n; self.my -= dy / self.n
+        self.cxx -= dx*(x - self.mx); self.cyy -= dy*(y - self.my); self.cxy -= dx*(y - self.my)
+
+    def update(self, x, y):
+        self.values.append((x, y)); self._add(x, y)
+        if len(self.values) > self.window: self._remove(*self.values.popleft())
+        self._updates += 1
+        if self._updates % self.RECOMPUTE_EVERY == 0: self._recompute()
+
+    def _recompute(self):
+        vals = list(self.values)
+        self.n = 0; self.mx = self.my = self.cxx = self.cyy = self.cxy = 0.0
+        for x, y in vals: self._add(x, y)
+
+    @property
+    def ready(self):
+        return self.n >= self.window and self.n > 1
+
+    def var_x(self): return max(self.cxx, 0.0) / (self.n - 1) if self.n > 1 else math.nan
+    def var_y(self): return max(self.cyy, 0.0) / (self.n - 1) if self.n > 1 else math.nan
+    def cov(self): return self.cxy / (self.n - 1) if self.n > 1 else math.nan
+    def corr(self):
+        den = math.sqrt(max(self.cxx, 0.0) * max(self.cyy, 0.0))
+        return self.cxy / den if den > 0 else math.nan
+
+class RollingStats(RollingCov):
+    """Single-series rolling mean/std/z-score (RollingCov with y == x)."""
+    def update(self, x):
+        super().update(x, x)
+    @property
+    def mean(self): return self.mx
+    def var(self): return self.var_x()
+    def std(self): return math.sqrt(self.var_x()) if self.n > 1 else math.nan
+    def zscore(self, x):
+        s = self.std()
+        return (x - self.mx) / s if s > 0 else math.nan
+
+class PairStats:
+    """Shared per-pair state: spread z-score and price correlation for several windows, updated per closed bar."""
+    def __init__(self, hedge_ratio=1.0, windows=(30,), corr_windows=()):
+        self.hedge_ratio = hedge_ratio
+        self.spread_stats = {w: RollingStats(w) for w in windows}
+        self.corr_stats = {w: RollingCov(w) for w in corr_windows}
+        self.spread = None
+
+    def update(self, a, b):
+        self.spread = a - self.hedge_ratio*b
+        for st in self.spread_stats.values(): st.update(self.spread)
+        for st in self.corr_stats.values(): st.update(a, b)
+
+    def seed(self, a, b):
+        for x, y in zip(np.asarray(a, 'float64').tolist(), np.asarray(b, 'float64').tolist()): self.update(x, y)
+
+    def zscore(self, window):
+        st = self.spread_stats[window]
+        return st.zscore(self.spread) if st.ready else None
+
+    def corr(self, window):
+        st = self.corr_stats[window]
+        return st.corr() if st.ready else None
@@ -0,0 +1,93 @@
+"""1s/1Min/5Min OHLCV rollup tables, merged at persist time so reads scale with bars rather than ticks."""
+import sqlite3
+from itertools import repeat
+import numpy as np, pandas as pd
+from . import partitions
+
+ROLLUPS = {'1S': ('bars_1s', 1000), '1Min': ('bars_1m', 60000), '5Min': ('bars_5m', 300000)}
+COLUMNS = ['ts', 'open', 'high', 'low', 'close', 'volume']
+
+def init_tables(cur):
+    """Create missing rollup tables; returns the names that were newly created."""
+    have = {r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    created = []
+    for table, _ in ROLLUPS.values():
+        if table in have: continue
+        cur.execute(f'''CREATE TABLE {table} (symbol TEXT, ts INTEGER, open REAL, high REAL, low REAL, close REAL, volume REAL,
+                        first_ts INTEGER, last_ts INTEGER, n INTEGER, PRIMARY KEY (symbol, ts)) WITHOUT ROWID''')
+        created.append(table)
+    return created
+
+def tf_millis(timeframe):
+    try: return int(pd.Timedelta(timeframe).value // 1_000_000)
+    except ValueError: return None
+
+def pick_rollup(timeframe):
+    """Coarsest rollup whose bar length divides the requested timeframe, as (tf, table, ms), or None."""
+    ms = tf_millis(timeframe)
+    if not ms: return None
+    fits = [(m, tf, table) for tf, (table, m) in ROLLUPS.items() if ms % m == 0]
+    if not fits: return None
+    m, tf, table = max(fits)
+    return tf, table, m
+
+def compute_bars(ts, price, qty, ms):
+    """Bucket ticks into bars of `ms`: returns (start, open, high, low, close, volume, first_ts, last_ts, n) arrays."""
+    order = np.argsort(ts, kind='stable')
+    ts, price, qty = ts[order], price[order], qty[order]
+    b = ts - ts % ms
+    first = np.flatnonzero(np.r_[True, b[1:] != b[:-1]])
+    last = np.r_[first[1:], len(b)] - 1
+    return (b[first], price[first], np.maximum.reduceat(price, first), np.minimum.reduceat(price, first), price[last],
+            np.add.reduceat(qty, first), ts[first], ts[last], np.diff(np.r_[first, len(b)]))
+
+def upsert(cur, symbol, ts, price, qty):
+    """Merge a batch of one symbol's ticks into every rollup, combining with bars written by earlier flushes."""
+    if len(ts) == 0: return
+    for table, ms in ROLLUPS.values():
+        cols = compute_bars(ts, price, qty, ms)
+        cur.executemany(f'''INSERT INTO {table} (symbol, ts, open, high, low, close, volume, first_ts, last_ts, n)
+            VALUES (?,?,?,?,?,?,?,?,?,?)
+            ON CONFLICT(symbol, ts) DO UPDATE SET
+                open = CASE WHEN excluded.first_ts < first_ts THEN excluded.open ELSE open END,
+                high = max(high, excluded.high), low = min(low, excluded.low),
+                close = CASE WHEN excluded.last_ts >= last_ts THEN excluded.close ELSE close END,
+                volume = volume + excluded.volume, first_ts = min(first_ts, excluded.first_ts),
+                last_ts = max(last_ts, excluded.last_ts), n = n + excluded.n''',
+            zip(repeat(symbol), *(c.tolist() for c in cols)))
+
+def write_batches(writer, batches):
+    """Insert {symbol: (ts, price, qty)} arrays into the day tick partitions and all rollups in one transaction."""
+    n = 0
+    with writer.transaction() as cur:
+        for sym, (ts, price, qty) in batches.items():
+            if len(ts) == 0: continue
+            partitions.insert(cur, sym, ts, price, qty)
+            upsert(cur, sym, ts, price, qty)
+            n += len(ts)
+    writer.record(n)
+    return n
+
+def rows_to_batches(rows):
+    """Group (ts, symbol, price, qty) rows into per-symbol numpy column batches."""
+    grouped = {}
+    for ts, sym, price, qty in rows:
+        g = grouped.setdefault(sym, ([], [], []))
+        g[0].append(ts); g[1].append(price); g[2].append(qty)
+    return {s: (np.asarray(t, 'int64'), np.asarray(p, 'float64'), np.asarray(q, 'float64')) for s, (t, p, q) in grouped.items()}
+
+def rebuild(writer, chunk=500000):
+    """Backfill rollups from the legacy raw ticks table (used once when the rollup tables are first created)."""
+    src = sqlite3.connect(writer.path)
+    try:
+        cur = src.execute('SELECT ts, symbol, price, qty FROM ticks ORDER BY id')
+        total = 0
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows: break
+            with writer.transaction() as wcur:
+                for sym, (ts, price, qty) in rows_to_batches(rows).items(): upsert(wcur, sym, ts, price, qty)
+            total += len(rows)
+        return total
+    finally:
+        src.close()
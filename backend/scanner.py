@@ -0,0 +1,120 @@
+"""Background pair-universe scanner: batched OLS/correlation over all symbol pairs, ADF tests on a process pool."""
+import threading, time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+import numpy as np, pandas as pd
+from .analytics import run_adf_test
+from .bars import bar_aggregator, normalize_timeframe
+from .storage import get_bars, list_symbols
+
+TABLE_COLUMNS = ['pair', 'a', 'b', 'hedge_ratio', 'intercept', 'r_squared', 'corr', 'corr_recent', 'adf_stat', 'pvalue', 'bars', 'tested_at']
+
+def _adf(values):
+    return run_adf_test(pd.Series(values))
+
+def pair_regressions(prices):
+    """OLS of every column on every other in one pass over a (T, N) price matrix.
+
+    Returns (beta, alpha, corr) as N x N arrays where row i regressed on column j gives
+    prices[:, i] ~ alpha[i, j] + beta[i, j] * prices[:, j].
+    """
+    mean = prices.mean(axis=0)
+    xc = prices - mean
+    cov = xc.T @ xc / (len(prices) - 1)
+    var = np.diag(cov)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        beta = cov / var[None, :]
+        corr = cov / np.sqrt(np.outer(var, var))
+    alpha = mean[:, None] - beta * mean[None, :]
+    return beta, alpha, corr
+
+class PairScanner:
+    def __init__(self, symbols=None, timeframe='1Min', bars=2000, corr_window=30, retest_bars=50, min_bars=50, workers=None, interval=30):
+        self.symbols = symbols
+        self.timeframe = normalize_timeframe(timeframe)
+        self.bars = bars; self.corr_window = corr_window
+        self.retest_bars = retest_bars; self.min_bars = min_bars
+        self.workers = workers; self.interval = interval
+        self._adf_cache = {}   # (a, b) -> (last tested bar ts, result dict, tested_at)
+        self._table = pd.DataFrame(columns=TABLE_COLUMNS)
+        self._pool = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.last_scan_secs = 0.0
+        self.skipped = []   # symbols left out of the last scan for having fewer than min_bars bars
+
+    def set_timeframe(self, timeframe):
+        tf = normalize_timeframe(timeframe)
+        if tf != self.timeframe: self.timeframe = tf; self._adf_cache.clear()
+
+    def universe(self):
+        if self.symbols is not None: return list(self.symbols)
+        return sorted(set(bar_aggregator.symbols()) | set(list_symbols()))
+
+    def _prices(self, symbols):
+        closes = {}
+        for s in symbols:
+            df = get_bars(s, self.timeframe, self.bars)
+            if not df.empty: closes[s] = df['close']
+        if len(closes) < 2: return pd.DataFrame()
+        px = pd.concat(closes, axis=1).ffill()
+        # the matrix is inner-aligned, so a newly listed symbol would cut every pair down to its history
+        short = px.columns[px.notna().sum() < self.min_bars]
+        self.skipped = list(short)
+        return px.drop(columns=short).dropna().iloc[-self.bars:]
+
+    def scan(self):
+        t0 = time.perf_counter()
+        px = self._prices(self.universe())
+        if px.shape[1] < 2 or len(px) < self.min_bars:
+            self._table = pd.DataFrame(columns=TABLE_COLUMNS)
+            self.last_scan_secs = time.perf_counter() - t0; return self._table
+        cols = list(px.columns); P = px.to_numpy(dtype='float64')
+        beta, alpha, corr = pair_regressions(P)
+        corr_recent = pair_regressions(P[-self.corr_window:])[2] if len(P) >= self.corr_window else np.full_like(corr, np.nan)
+        idx_ts = px.index.as_unit('ms').asi8; last_ts = int(idx_ts[-1])
+        # re-test only pairs that have seen retest_bars new bars since their last ADF
+        due = {}
+        for i, j in combinations(range(len(cols)), 2):
+            key = (cols[i], cols[j]); cached = self._adf_cache.get(key)
+            if cached is None or int((idx_ts > cached[0]).sum()) >= self.retest_bars:
+                due[key] = P[:, i] - alpha[i, j] - beta[i, j]*P[:, j]
+        if due:
+            if self.workers != 1 and len(due) > 1:
+                if self._pool is None: self._pool = ProcessPoolExecutor(self.workers)
+                results = self._pool.map(_adf, list(due.values()))
+            else:
+                results = map(_adf, due.values())
+            now = time.time()
+            for key, res in zip(due, results): self._adf_cache[key] = (last_ts, res, now)
+        rows = []
+        for i, j in combinations(range(len(cols)), 2):
+            _, res, tested = self._adf_cache.get((cols[i], cols[j]), (None, {}, None))
+            rows.append([f'{cols[i]}/{cols[j]}', cols[i], cols[j], beta[i, j], alpha[i, j], corr[i, j]**2, corr[i, j], corr_recent[i, j],
+                         res.get('adf_stat', np.nan), res.get('pvalue', np.nan), len(P), tested])
+        table = pd.DataFrame(rows, columns=TABLE_COLUMNS)
+        table['abs_corr'] = table['corr'].abs()
+        self._table = table.sort_values(['pvalue', 'abs_corr'], ascending=[True, False]).drop(columns='abs_corr').reset_index(drop=True)
+        self.last_scan_secs = time.perf_counter() - t0
+        return self._table
+
+    def table(self):
+        """Latest ranked table (never blocks on a running scan)."""
+        return self._table
+
+    def _run(self):
+        while not self._stop.is_set():
+            try: self.scan()
+            except Exception as e: print('scanner error', e)
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True); self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._pool is not None: self._pool.shutdown(wait=False); self._pool = None
+
+scanner = PairScanner()
@@ -0,0 +1,197 @@
+"""Memory-mapped live feed from the backend process to readers (frontend, alerts) in other processes.
+
+Layout: a fixed header, a symbol table, per-symbol tick counters, then a ring of 72-byte records.
+The writer marks a record in-flight, fills it, stamps it with its sequence number and only then
+publishes the new head sequence, so a reader that sees head=N can read records < N. Readers check the
+stamp before and after copying (a seqlock): a record whose stamp changed was overwritten mid-copy.
+"""
+import mmap, os, struct, tempfile, threading, time
+import numpy as np
+
+FEED_PATH = os.getenv('QUANT_FEED_PATH', os.path.join(tempfile.gettempdir(), 'quant_live_feed.bin'))
+MAGIC = b'QFEED001'
+CAPACITY = 1 << 18
+MAX_SYMBOLS = 256
+NAME_BYTES = 24
+KIND_TICK = 0   # f0, f1 = price, qty; readers rebuild bars from ticks
+
+_HEADER = struct.Struct('<8sQQQQ')   # magic, capacity, n_symbols, head_seq, writer_pid
+HEADER_BYTES = 64
+RECORD = np.dtype([('seq', '<u8'), ('ts', '<i8'), ('sym', '<i4'), ('kind', '<i4'), ('tf_ms', '<i8'), ('f', '<f8', (5,))])
+assert RECORD.itemsize == 72
+SYMTAB_BYTES = MAX_SYMBOLS * NAME_BYTES
+COUNTS_OFFSET = HEADER_BYTES + SYMTAB_BYTES
+RING_OFFSET = COUNTS_OFFSET + MAX_SYMBOLS * 8
+
+def _size(capacity):
+    return RING_OFFSET + capacity * RECORD.itemsize
+
+def _alive(pid):
+    if os.name == 'nt': return True   # os.kill(pid, 0) would terminate the process on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+class FeedWriter:
+    def __init__(self, path=FEED_PATH, capacity=CAPACITY):
+        self.path = path; self.capacity = capacity
+        # build the segment under a temp name and rename it in, so readers of a previous
+        # segment keep a valid mapping and notice the new inode instead of faulting on a truncated file
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as fh: fh.truncate(_size(capacity))
+        self._fh = open(tmp, 'r+b')
+        self._mm = mmap.mmap(self._fh.fileno(), _size(capacity))
+        self.ring = np.ndarray(capacity, dtype=RECORD, buffer=self._mm, offset=RING_OFFSET)
+        self.counts = np.ndarray(MAX_SYMBOLS, dtype='<u8', buffer=self._mm, offset=COUNTS_OFFSET)
+        self._head = np.ndarray(1, dtype='<u8', buffer=self._mm, offset=8 + 8 + 8)
+        self._nsym = np.ndarray(1, dtype='<u8', buffer=self._mm, offset=8 + 8)
+        self._ids = {}
+        self._lock = threading.Lock()
+        self.seq = 0
+        _HEADER.pack_into(self._mm, 0, MAGIC, capacity, 0, 0, os.getpid())
+        os.replace(tmp, path)
+        self._ino = os.fstat(self._fh.fileno()).st_ino
+
+    def _sym_id(self, symbol):
+        i = self._ids.get(symbol)
+        if i is None:
+            i = len(self._ids)
+            if i >= MAX_SYMBOLS: raise ValueError('feed symbol table full')
+            name = symbol.encode()[:NAME_BYTES]
+            off = HEADER_BYTES + i*NAME_BYTES
+            self._mm[off:off + NAME_BYTES] = name.ljust(NAME_BYTES, b'\0')
+            self._ids[symbol] = i; self._nsym[0] = i + 1
+        return i
+
+    def _put(self, symbol, ts, kind, tf_ms, f):
+        with self._lock:
+            sid = self._sym_id(symbol)
+            seq = self.seq; r = self.ring[seq % self.capacity]
+            r['seq'] = np.iinfo(np.uint64).max  # mark in-flight so a racing reader rejects it
+            r['ts'] = ts; r['sym'] = sid; r['kind'] = kind; r['tf_ms'] = tf_ms; r['f'] = f
+            r['seq'] = seq
+            if kind == KIND_TICK: self.counts[sid] += 1
+            self.seq = seq + 1; self._head[0] = self.seq
+
+    def publish_tick(self, symbol, ts, price, qty):
+        self._put(symbol, ts, KIND_TICK, 0, (price, qty, 0.0, 0.0, 0.0))
+
+    def close(self):
+        self.ring = self.counts = self._head = self._nsym = None
+        self._mm.close(); self._fh.close()
+        # leave a segment a newer backend has already renamed into place alone
+        try:
+            if os.stat(self.path).st_ino == self._ino: os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+class FeedReader:
+    def __init__(self, path=FEED_PATH):
+        self.path = path
+        self._mm = None; self._ino = None
+        self.next_seq = None
+        self.lapped = 0
+
+    def _open(self):
+        try:
+            fh = open(self.path, 'rb')
+        except FileNotFoundError:
+            return False
+        try:
+            ino = os.fstat(fh.fileno()).st_ino
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return False  # empty file
+        finally:
+            fh.close()
+        magic, capacity, _, _, pid = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or len(mm) < _size(capacity) or not _alive(pid): mm.close(); return False
+        self._mm = mm; self.capacity = capacity; self.writer_pid = pid; self._ino = ino
+        self.ring = np.ndarray(capacity, dtype=RECORD, buffer=mm, offset=RING_OFFSET)
+        self.counts_arr = np.ndarray(MAX_SYMBOLS, dtype='<u8', buffer=mm, offset=COUNTS_OFFSET)
+        self._symbols = []
+        return True
+
+    def connected(self):
+        """True while the segment's writer is running; a removed segment or a dead writer means no live feed."""
+        if self._mm is not None:
+            # a restarted backend renames a fresh segment into place; remap when the inode changes
+            try:
+                if os.stat(self.path).st_ino == self._ino and _alive(self.writer_pid): return True
+            except FileNotFoundError:
+                pass
+            self.ring = self.counts_arr = None; self._mm.close()
+            self._mm = None; self.next_seq = None
+        return self._open()
+
+    def head(self):
+        return _HEADER.unpack_from(self._mm, 0)[3]
+
+    def symbols(self):
+        n = _HEADER.unpack_from(self._mm, 0)[2]
+        while len(self._symbols) < n:
+            off = HEADER_BYTES + len(self._symbols)*NAME_BYTES
+            self._symbols.append(bytes(self._mm[off:off + NAME_BYTES]).rstrip(b'\0').decode())
+        return self._symbols
+
+    def counts(self):
+        """Ticks published per symbol since the backend started (read straight from the header)."""
+        if not self.connected(): return {}
+        syms = self.symbols()
+        return {s: int(self.counts_arr[i]) for i, s in enumerate(syms)}
+
+    def poll(self, max_records=None):
+        """Records published since the previous poll, as a structured numpy array (a copy)."""
+        if not self.connected(): return np.empty(0, RECORD)
+        head = self.head()
+        if self.next_seq is None: self.next_seq = max(head - self.capacity, 0)
+        lo = max(self.next_seq, head - self.capacity)
+        if lo > self.next_seq: self.lapped += lo - self.next_seq
+        hi = head if max_records is None else min(head, lo + max_records)
+        if hi <= lo: return np.empty(0, RECORD)
+        i, j = lo % self.capacity, hi % self.capacity
+        out = self.ring[i:j].copy() if i < j else np.concatenate([self.ring[i:], self.ring[:j]])
+        # seqlock: keep records whose stamp matched both in the copy and after it, so one the writer
+        # started overwriting after its stamp was copied is dropped too
+        seq = self.ring['seq'][i:j] if i < j else np.concatenate([self.ring['seq'][i:], self.ring['seq'][:j]])
+        want = np.arange(lo, hi, dtype='<u8')
+        ok = (out['seq'] == want) & (seq == want)
+        if not ok.all(): self.lapped += int((~ok).sum()); out = out[ok]
+        self.next_seq = hi
+        return out
+
+class FeedFollower:
+    """Replays ticks from another process's feed into this process's bar aggregator (and so its alert engine)."""
+    def __init__(self, aggregator, reader=None, interval=0.1):
+        self.aggregator = aggregator; self.reader = reader or FeedReader(); self.interval = interval
+        self._stop = threading.Event(); self._thread = None
+        self.records = 0
+
+    def step(self):
+        recs = self.reader.poll()
+        ticks = recs[recs['kind'] == KIND_TICK]
+        if len(ticks):
+            syms = self.reader.symbols(); upd = self.aggregator.update
+            for sid, ts, f in zip(ticks['sym'].tolist(), ticks['ts'].tolist(), ticks['f'][:, :2].tolist()):
+                upd(syms[sid], ts, f[0], f[1])
+        self.records += len(recs)
+        return len(recs)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.step(): time.sleep(self.interval)
+            except Exception as e:
+                print('feed follower error', e); time.sleep(1.0)
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True); self._thread.start()
+
+    def stop(self):
+        self._stop.set()
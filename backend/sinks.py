@@ -0,0 +1,255 @@
+"""Persistence sinks: each has its own bounded queue, batching worker, retry/backoff and backpressure policy.
+
+persist_loop drains the tick rings and hands the same {symbol: (ts, price, qty)} batch to every sink
+through SinkHub.submit, which never waits on a sink's I/O; a slow or unreachable sink only fills its
+own queue and then applies its policy:
+
+    drop_oldest  evict the oldest queued batches to make room (live data matters most)
+    drop_newest  reject the incoming batch
+    block        wait up to block_timeout for room, then reject (for callers that prefer to slow down)
+"""
+import json, os, random, threading, time
+from collections import deque
+import numpy as np
+from . import rollups
+from .metrics import registry
+try:
+    import pyarrow as pa, pyarrow.parquet as pq
+except Exception:
+    pa = pq = None
+
+DROP_OLDEST, DROP_NEWEST, BLOCK = 'drop_oldest', 'drop_newest', 'block'
+SEGMENT_DIR = os.getenv('QUANT_SEGMENT_DIR')
+
+SINK_QUEUE = registry.gauge('sink_queue_ticks', 'Ticks queued per sink', ('sink',))
+SINK_WRITTEN = registry.counter('sink_written_ticks_total', 'Ticks written per sink', ('sink',))
+SINK_DROPPED = registry.counter('sink_dropped_ticks_total', 'Ticks dropped by the backpressure policy', ('sink',))
+SINK_FAILED = registry.counter('sink_failed_ticks_total', 'Ticks abandoned after exhausting retries', ('sink',))
+SINK_RETRIES = registry.counter('sink_retries_total', 'Failed write attempts that were retried', ('sink',))
+SINK_WRITE_SECONDS = registry.histogram('sink_write_seconds', 'Write latency per sink batch', ('sink',))
+
+def _ticks(batches):
+    return sum(len(b[0]) for b in batches.values())
+
+def merge_batches(items):
+    """Concatenate several {symbol: (ts, price, qty)} batches, keeping arrival order per symbol."""
+    if len(items) == 1: return items[0]
+    parts = {}
+    for b in items:
+        for sym, cols in b.items(): parts.setdefault(sym, []).append(cols)
+    return {sym: tuple(np.concatenate([c[k] for c in cs]) for k in range(3)) for sym, cs in parts.items()}
+
+class Sink:
+    """Base sink: subclasses implement write(batches); everything else (queueing, batching, retries) lives here.
+
+    The worker takes up to flush_ticks queued ticks per write, waiting up to `linger` seconds for a
+    batch to fill. A failed write is retried with full-jitter exponential backoff; after `retries`
+    failures (None = forever) its ticks are counted as failed and dropped.
+    """
+    def __init__(self, name, max_ticks=1_000_000, policy=DROP_OLDEST, block_timeout=1.0, flush_ticks=200_000,
+                 linger=0.0, retries=5, backoff_base=0.2, backoff_max=10.0):
+        self.name = name; self.max_ticks = max_ticks; self.policy = policy; self.block_timeout = block_timeout
+        self.flush_ticks = flush_ticks; self.linger = linger
+        self.retries = retries; self.backoff_base = backoff_base; self.backoff_max = backoff_max
+        self._q = deque(); self._queued = 0; self._inflight = 0
+        self._cv = threading.Condition()
+        self._closing = threading.Event(); self._thread = None
+        self.submitted = self.written = self.dropped = self.failed = self.retried = 0
+        self.last_error = None
+        self._m_queue = SINK_QUEUE.labels(name); self._m_written = SINK_WRITTEN.labels(name)
+        self._m_dropped = SINK_DROPPED.labels(name); self._m_failed = SINK_FAILED.labels(name)
+        self._m_retries = SINK_RETRIES.labels(name); self._m_write = SINK_WRITE_SECONDS.labels(name)
+
+    def write(self, batches):
+        raise NotImplementedError
+
+    def _drop(self, n):
+        self.dropped += n; self._m_dropped.inc(n)
+
+    def submit(self, batches):
+        """Queue a batch without waiting on I/O (except under BLOCK); returns False if it was rejected."""
+        n = _ticks(batches)
+        if not n: return True
+        with self._cv:
+            full = lambda: self._q and self._queued + n > self.max_ticks
+            if full():
+                if self.policy == BLOCK:
+                    self._cv.wait_for(lambda: not full() or self._closing.is_set(), self.block_timeout)
+                elif self.policy == DROP_OLDEST:
+                    while full():
+                        _, k, _ = self._q.popleft(); self._queued -= k; self._drop(k)
+                if full():
+                    self._drop(n); return False
+            self._q.append((batches, n, time.monotonic())); self._queued += n; self.submitted += n
+            self._m_queue.set(self._queued)
+            self._cv.notify_all()
+        return True
+
+    def _take(self):
+        with self._cv:
+            if not self._cv.wait_for(lambda: self._q or self._closing.is_set(), 1.0) or not self._q: return None, 0
+            if self.linger and not self._closing.is_set():
+                deadline = self._q[0][2] + self.linger
+                self._cv.wait_for(lambda: self._queued >= self.flush_ticks or self._closing.is_set(), max(0.0, deadline - time.monotonic()))
+            items = []; n = 0
+            while self._q and (not items or n + self._q[0][1] <= self.flush_ticks):
+                b, k, _ = self._q.popleft(); items.append(b); n += k
+            self._queued -= n; self._inflight = n
+            self._m_queue.set(self._queued)
+            self._cv.notify_all()
+        return merge_batches(items), n
+
+    def _write_with_retry(self, batches, n):
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            try:
+                self.write(batches)
+                self._m_write.observe(time.perf_counter() - t0)
+                self.written += n; self._m_written.inc(n)
+                return
+            except Exception as e:
+                attempt += 1; self.last_error = str(e)
+                if self.retries is not None and attempt > self.retries:
+                    self.failed += n; self._m_failed.inc(n)
+                    print(f'{self.name} sink dropped {n} ticks after {attempt} attempts:', e)
+                    return
+                self.retried += 1; self._m_retries.inc()
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+    def _run(self):
+        while True:
+            batches, n = self._take()
+            if batches is None:
+                if self._closing.is_set(): return
+                continue
+            self._write_with_retry(batches, n)
+            with self._cv:
+                self._inflight = 0; self._cv.notify_all()
+
+    def start(self):
+        if self._thread and self._thread.is_alive(): return
+        self._closing.clear()
+        self._thread = threading.Thread(target=self._run, name=f'sink-{self.name}', daemon=True); self._thread.start()
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written (or abandoned); returns False on timeout."""
+        if not (self._thread and self._thread.is_alive()): return not self._q
+        with self._cv:
+            return self._cv.wait_for(lambda: not self._q and not self._inflight, timeout)
+
+    def stop(self, timeout=10.0):
+        """Write what is queued, then stop the worker."""
+        self._closing.set()
+        with self._cv: self._cv.notify_all()
+        if self._thread: self._thread.join(timeout)
+
+    def stats(self):
+        q = self._m_write.quantiles()
+        return {'sink': self.name, 'policy': self.policy, 'queued': self._queued, 'submitted': self.submitted,
+                'written': self.written, 'dropped': self.dropped, 'failed': self.failed, 'retried': self.retried,
+                'write_ms_p50': 1000*q[0.5], 'write_ms_p99': 1000*q[0.99], 'last_error': self.last_error}
+
+class SQLiteSink(Sink):
+    """Ticks and rollup bars in one transaction; retries forever since it is the store reads are served from."""
+    def __init__(self, writer, name='sqlite', **kw):
+        kw.setdefault('max_ticks', 5_000_000); kw.setdefault('policy', DROP_NEWEST); kw.setdefault('retries', None)
+        super().__init__(name, **kw)
+        self.writer = writer
+
+    def write(self, batches):
+        rollups.write_batches(self.writer, batches)
+
+class MongoSink(Sink):
+    """insert_many into any collection-like object (pymongo, or a stand-in with insert_many).
+
+    After a partial bulk failure only the documents listed in writeErrors are retried, so a retry never
+    inserts again what already succeeded; duplicate-key errors (code 11000) count as stored.
+    """
+    def __init__(self, collection, name='mongo', **kw):
+        kw.setdefault('retries', 3); kw.setdefault('backoff_max', 30.0)
+        super().__init__(name, **kw)
+        self.collection = collection
+        self._pending = (None, None)   # (batch, documents still to insert) across retries of that batch
+
+    def write(self, batches):
+        batch, docs = self._pending
+        if batch is not batches:
+            docs = [{'ts': t, 'symbol': sym, 'price': p, 'qty': q} for sym, (ts, price, qty) in batches.items()
+                    for t, p, q in zip(ts.tolist(), price.tolist(), qty.tolist())]
+        try:
+            self.collection.insert_many(docs, ordered=False)
+            self._pending = (None, None)
+        except Exception as e:
+            errors = (getattr(e, 'details', None) or {}).get('writeErrors')
+            if errors is not None:
+                docs = [docs[err['index']] for err in errors if err.get('code') != 11000]
+                if not docs: self._pending = (None, None); return
+            self._pending = (batches, docs)
+            raise
+
+class FileSink(Sink):
+    """One immutable segment per flush: Parquet when pyarrow is installed, else NDJSON the importer can read."""
+    def __init__(self, directory=SEGMENT_DIR, name='file', fmt=None, **kw):
+        kw.setdefault('linger', 60.0); kw.setdefault('flush_ticks', 500_000)
+        super().__init__(name, **kw)
+        self.directory = directory; self.fmt = fmt or ('parquet' if pq is not None else 'ndjson')
+        os.makedirs(directory, exist_ok=True)
+        self.segments = 0
+
+    def write(self, batches):
+        syms = list(batches)
+        ts = np.concatenate([batches[s][0] for s in syms]); price = np.concatenate([batches[s][1] for s in syms])
+        qty = np.concatenate([batches[s][2] for s in syms])
+        symbol = np.repeat(np.asarray(syms, object), [len(batches[s][0]) for s in syms])
+        order = np.argsort(ts, kind='stable'); ts, price, qty, symbol = ts[order], price[order], qty[order], symbol[order]
+        path = os.path.join(self.directory, f'ticks-{int(ts[0])}-{os.getpid()}-{self.segments:05d}.{self.fmt}')
+        tmp = path + '.tmp'
+        if self.fmt == 'parquet':
+            pq.write_table(pa.table({'ts': ts, 'symbol': symbol.tolist(), 'price': price, 'qty': qty}), tmp, compression='zstd')
+        else:
+            with open(tmp, 'w') as fh:
+                fh.writelines(f'{{"ts":{t},"symbol":{json.dumps(s)},"price":{p!r},"qty":{q!r}}}\n'
+                              for t, s, p, q in zip(ts.tolist(), symbol.tolist(), price.tolist(), qty.tolist()))
+        os.replace(tmp, path)  # readers never see a partial segment
+        self.segments += 1
+
+class FakeSink(Sink):
+    """Test/benchmark sink: sleeps `latency` seconds per write and fails with probability `fail_rate`."""
+    def __init__(self, name='fake', latency=0.0, fail_rate=0.0, seed=0, **kw):
+        super().__init__(name, **kw)
+        self.latency = latency; self.fail_rate = fail_rate; self._rng = random.Random(seed)
+        self.batch_sizes = []
+
+    def write(self, batches):
+        if self.latency: time.sleep(self.latency)
+        if self.fail_rate and self._rng.random() < self.fail_rate: raise IOError('injected sink failure')
+        self.batch_sizes.append(_ticks(batches))
+
+class SinkHub:
+    """Fan-out of drained batches to independent sinks."""
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def add(self, sink):
+        self.sinks.append(sink); return sink
+
+    def get(self, name):
+        return next((s for s in self.sinks if s.name == name), None)
+
+    def submit(self, batches):
+        return {s.name: s.submit(batches) for s in self.sinks}
+
+    def start(self):
+        for s in self.sinks: s.start()
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return all(s.flush(None if deadline is None else max(0.0, deadline - time.monotonic())) for s in self.sinks)
+
+    def stop(self, timeout=10.0):
+        for s in self.sinks: s._closing.set()
+        for s in self.sinks: s.stop(timeout)
+
+    def stats(self):
+        return [s.stats() for s in self.sinks]
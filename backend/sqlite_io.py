@@ -0,0 +1,104 @@
+"""SQLite access: one persistent WAL-mode writer per process and a pool of read-only connections."""
+import sqlite3, os, threading, queue, time
+from contextlib import contextmanager
+
+DBPATH = os.path.abspath(os.getenv('QUANT_DB_PATH') or os.path.join(os.path.dirname(__file__), '..', 'data_ticks.db'))
+
+def _tune(conn):
+    conn.execute('PRAGMA busy_timeout=5000')
+    conn.execute('PRAGMA cache_size=-65536')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA mmap_size=268435456')
+
+class SQLiteWriter:
+    def __init__(self, path=DBPATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self.rows_written = 0
+        self.batches = 0
+        self.last_batch_rows = 0
+        self.last_batch_secs = 0.0
+        self.write_secs = 0.0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA wal_autocheckpoint=10000')
+        _tune(conn)
+        return conn
+
+    @property
+    def conn(self):
+        if self._conn is None: self._conn = self._connect()
+        return self._conn
+
+    @contextmanager
+    def transaction(self):
+        """Yield a cursor inside one BEGIN IMMEDIATE ... COMMIT; rolls back on error."""
+        with self._lock:
+            cur = self.conn.cursor()
+            t0 = time.perf_counter()
+            cur.execute('BEGIN IMMEDIATE')
+            try:
+                yield cur
+                cur.execute('COMMIT')
+            except Exception:
+                cur.execute('ROLLBACK'); raise
+            self.last_batch_secs = time.perf_counter() - t0
+            self.write_secs += self.last_batch_secs
+            self.batches += 1
+
+    def record(self, n):
+        self.rows_written += n; self.last_batch_rows = n
+
+    def rows_per_sec(self):
+        return self.rows_written / self.write_secs if self.write_secs else 0.0
+
+    def stats(self):
+        return {'rows_written': self.rows_written, 'batches': self.batches, 'last_batch_rows': self.last_batch_rows,
+                'last_batch_secs': self.last_batch_secs, 'rows_per_sec': self.rows_per_sec()}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None: self._conn.close(); self._conn = None
+
+class ReadPool:
+    def __init__(self, path=DBPATH, size=4):
+        self.path = path
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _connect(self):
+        uri = 'file:' + self.path.replace('?', '%3f') + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        _tune(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try: conn = self._idle.get_nowait()
+        except queue.Empty: conn = self._connect()
+        ok = False
+        try:
+            yield conn; ok = True
+        finally:
+            if not ok: conn.close()
+            else:
+                try: self._idle.put_nowait(conn)
+                except queue.Full: conn.close()
+
+    def close(self):
+        while True:
+            try: self._idle.get_nowait().close()
+            except queue.Empty: return
+
+_writer = None
+_writer_lock = threading.Lock()
+def get_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None: _writer = SQLiteWriter()
+        return _writer
+
+read_pool = ReadPool()
@@ -1,27 +1,226 @@
-import sqlite3, os, pandas as pd
-DBPATH = os.path.join(os.path.dirname(__file__), '..', 'data_ticks.db')
-def get_recent(symbol, limit=1000):
-    conn = sqlite3.connect(DBPATH)
-    cur = conn.cursor()
-    cur.execute('SELECT ts, price, qty FROM ticks WHERE symbol=? ORDER BY ts DESC LIMIT ?', (symbol, limit))
-    rows = cur.fetchall(); conn.close()
-    if not rows: return pd.DataFrame()
+import sqlite3, os, threading, pandas as pd
+from collections import OrderedDict
+from operator import itemgetter
+from . import partitions
+from .bars import bar_aggregator, normalize_timeframe
+from .sqlite_io import read_pool
+from .rollups import pick_rollup, tf_millis, COLUMNS as BAR_COLUMNS
+from .metrics import registry
+CACHE_MAX_BYTES = int(os.getenv('STORAGE_CACHE_MB', '256')) * 2**20
+CACHE_MAX_ROWS = 200000
+class _Entry:
+    __slots__ = ('df', 'wm', 'n_at_wm', 'complete', 'nbytes')
+    def __init__(self, df, wm=None, n_at_wm=0, complete=False):
+        self.df = df; self.wm = wm; self.n_at_wm = n_at_wm; self.complete = complete
+        self.nbytes = int(df.memory_usage(index=True).sum()) if not df.empty else 0
+class QueryCache:
+    """Process-wide LRU of frames keyed by (symbol, timeframe), bounded by total bytes."""
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict(); self._lock = threading.Lock()
+        self.hits = 0; self.misses = 0; self.evictions = 0
+    def get(self, key):
+        with self._lock:
+            e = self._entries.get(key)
+            if e is None: self.misses += 1; return None
+            self._entries.move_to_end(key); self.hits += 1; return e
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry; self._entries.move_to_end(key)
+            while len(self._entries) > 1 and self.nbytes() > self.max_bytes:
+                self._entries.popitem(last=False); self.evictions += 1
+    def invalidate(self, symbol=None):
+        with self._lock:
+            for k in [k for k in self._entries if symbol is None or k[0] == symbol]: del self._entries[k]
+    def nbytes(self):
+        return sum(e.nbytes for e in self._entries.values())
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.nbytes(), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+query_cache = QueryCache()
+QUERY_SECONDS = registry.histogram('storage_query_seconds', 'Storage read latency by function', ('fn',))
+DB_QUERY_SECONDS = registry.histogram('sqlite_query_seconds', 'SQLite read statement latency')
+registry.gauge('storage_cache_bytes', 'Bytes held by the query cache').set_function(lambda: query_cache.stats()['bytes'])
+registry.counter('storage_cache_hits_total', 'Query cache hits').set_function(lambda: query_cache.hits)
+registry.counter('storage_cache_misses_total', 'Query cache misses').set_function(lambda: query_cache.misses)
+registry.counter('storage_cache_evictions_total', 'Query cache evictions').set_function(lambda: query_cache.evictions)
+def invalidate_cache(symbol=None):
+    query_cache.invalidate(symbol)
+def _query(sql, args, strict=False):
+    try:
+        with read_pool.connection() as conn, DB_QUERY_SECONDS.time():
+            return conn.execute(sql, args).fetchall()
+    except sqlite3.OperationalError:
+        # database not created yet (backend never started); strict callers handle it themselves
+        if strict: raise
+        return []
+def _frame(rows):
     df = pd.DataFrame(rows, columns=['ts','price','qty'])
     df['timestamp'] = pd.to_datetime(df['ts'], unit='ms')
-    df = df.set_index('timestamp').sort_index()
-    return df[['price','qty']]
-def get_resampled(symbol, timeframe='1Min', limit=10000):
-    df = get_recent(symbol, limit=limit)
-    if df.empty: return df
-    # normalize timeframe strings from UI
-    tf = timeframe
-    if tf.lower() in ['1s','1sec','1second']:
-        tf = '1S'
-    if tf.lower()=='1min' or tf=='1Min':
-        tf = '1Min'
-    if tf.lower()=='5min' or tf=='5Min':
-        tf = '5Min'
+    return df.set_index('timestamp')
+def _to_ms(t):
+    if t is None or isinstance(t, (int, float)): return t
+    return int(pd.Timestamp(t).value // 1_000_000)
+def _sources(start=None, end=None):
+    """Days overlapping [start, end] as (day_ms, tables, archive parts), newest first; a legacy `ticks` table comes last.
+
+    Tables and registered archive parts come from one statement, and compaction registers a day's parts
+    in the transaction that drops its table, so a day is never missed or read twice. A day can still
+    have both, when ticks arrived after it was archived; it is then one entry read from both.
+    """
+    days = {}; legacy = False
+    for kind, ref, d in _query(partitions.SOURCES_SQL, ()):
+        if ref == partitions.LEGACY: legacy = True; continue
+        if kind == 'table': d = partitions.table_day(ref)
+        if (start is None or d + partitions.DAY_MS > start) and (end is None or d <= end):
+            days.setdefault(d, ([], []))[kind == 'part'].append(ref)
+    out = [(d, tables, parts) for d, (tables, parts) in sorted(days.items(), reverse=True)]
+    if legacy: out.append((None, [partitions.LEGACY], []))
+    return out
+def _scan(symbol, start, end, limit, strict):
+    chunks = []; n = 0
+    for d, tables, parts in _sources(start, end):
+        if limit is not None and n >= limit: break
+        if parts:
+            ts, price, qty = partitions.read_parts(sorted(parts), symbol, start, end)
+            rows = list(zip(ts.tolist(), price.tolist(), qty.tolist()))
+            if limit is not None: rows = rows[-limit:]
+            if rows: chunks.append(rows); n += len(rows)
+        for ref in tables:
+            sql = f'SELECT ts, price, qty FROM {ref} WHERE symbol=?'; args = [symbol]
+            if start is not None: sql += ' AND ts>=?'; args.append(start)
+            if end is not None: sql += ' AND ts<=?'; args.append(end)
+            if limit is None: rows = _query(sql + ' ORDER BY ts, rowid', args, strict)
+            else: rows = _query(sql + ' ORDER BY ts DESC, rowid DESC LIMIT ?', args + [limit], strict); rows.reverse()
+            if rows: chunks.append(rows); n += len(rows)
+    rows = [r for c in reversed(chunks) for r in c]
+    if len(chunks) > 1: rows.sort(key=itemgetter(0))  # stable, and near-linear on already ordered runs
+    return rows if limit is None else rows[-limit:]
+def _tick_rows(symbol, start=None, end=None, limit=None):
+    """(ts, price, qty) rows with start <= ts <= end in time order, scanning only overlapping partitions; with limit, the newest `limit`."""
+    for attempt in range(3):
+        try: return _scan(symbol, start, end, limit, strict=attempt < 2)
+        except sqlite3.OperationalError: pass  # a listed partition was compacted away meanwhile; list again
+def _ticks(symbol, limit):
+    """Cached tick frame for symbol holding at least `limit` rows, topped up with rows past the ts watermark."""
+    key = (symbol, 'tick'); e = query_cache.get(key)
+    if e is None or (len(e.df) < limit and not e.complete):
+        rows = _tick_rows(symbol, limit=limit)
+        if not rows: return pd.DataFrame()
+        wm = rows[-1][0]
+        e = _Entry(_frame(rows), wm, sum(1 for r in rows if r[0] == wm), complete=len(rows) < limit)
+    else:
+        rows = _tick_rows(symbol, start=e.wm)
+        # rows sharing the watermark ts that were already cached come back first; skip them
+        k = 0
+        while k < len(rows) and k < e.n_at_wm and rows[k][0] == e.wm: k += 1
+        rows = rows[k:]
+        if rows:
+            wm = rows[-1][0]; n_at = sum(1 for r in rows if r[0] == wm) + (e.n_at_wm if wm == e.wm else 0)
+            df = pd.concat([e.df, _frame(rows)])
+            complete = e.complete
+            if len(df) > max(CACHE_MAX_ROWS, limit): df = df.iloc[-max(CACHE_MAX_ROWS, limit):]; complete = False
+            e = _Entry(df, wm, n_at, complete)
+    query_cache.put(key, e)
+    return e.df
+@QUERY_SECONDS.time('get_recent')
+def get_recent(symbol, limit=1000):
+    df = _ticks(symbol, limit)
+    if df.empty: return pd.DataFrame()
+    return df[['price','qty']].iloc[-limit:]
+@QUERY_SECONDS.time('get_range')
+def get_range(symbol, start=None, end=None):
+    """Ticks with start <= ts <= end (ms ints or anything pd.Timestamp accepts); open-ended when None."""
+    start, end = _to_ms(start), _to_ms(end)
+    e = query_cache.get((symbol, 'tick'))
+    if e is not None and not e.df.empty and (e.complete or (start is not None and start >= int(e.df['ts'].iloc[0]))):
+        df = _ticks(symbol, len(e.df))
+        if start is not None: df = df[df['ts'] >= start]
+        if end is not None: df = df[df['ts'] <= end]
+        return df[['price','qty']]
+    rows = _tick_rows(symbol, start, end)
+    if not rows: return pd.DataFrame()
+    return _frame(rows)[['price','qty']]
+def _resample(df, tf):
     o = df['price'].resample(tf).ohlc()
     v = df['qty'].resample(tf).sum().rename('volume')
     out = o.join(v); out['price_mean'] = (out['open']+out['close'])/2
     return out.dropna()
+def _bar_frame(rows):
+    df = pd.DataFrame(rows, columns=BAR_COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['ts'], unit='ms')
+    return df.set_index('timestamp')
+def _rollup(symbol, tf, limit, start=None, end=None):
+    """Bars for tf built from the coarsest fitting rollup table, or None when that table has nothing for symbol."""
+    pick = pick_rollup(tf)
+    if pick is None: return None
+    base_tf, table, ms = pick
+    ratio = max(tf_millis(tf) // ms, 1)
+    cols = ', '.join(BAR_COLUMNS)
+    if start is not None or end is not None:
+        sql = f'SELECT {cols} FROM {table} WHERE symbol=?'; args = [symbol]
+        if start is not None: sql += ' AND ts>=?'; args.append(start - start % ms)
+        if end is not None: sql += ' AND ts<=?'; args.append(end)
+        rows = _query(sql + ' ORDER BY ts', args)
+        if not rows: return None
+        df = _bar_frame(rows)
+    else:
+        want = limit * ratio
+        key = (symbol, table); e = query_cache.get(key)
+        if e is None or (len(e.df) < want and not e.complete):
+            rows = _query(f'SELECT {cols} FROM {table} WHERE symbol=? ORDER BY ts DESC LIMIT ?', (symbol, want))
+            if not rows: return None
+            rows.reverse(); e = _Entry(_bar_frame(rows), rows[-1][0], complete=len(rows) < want)
+        else:
+            # the bar at the watermark may have been merged into since; re-read it and everything newer
+            rows = _query(f'SELECT {cols} FROM {table} WHERE symbol=? AND ts>=? ORDER BY ts', (symbol, e.wm))
+            if rows:
+                df = pd.concat([e.df[e.df['ts'] < e.wm], _bar_frame(rows)])
+                e = _Entry(df.iloc[-max(want, CACHE_MAX_ROWS):], rows[-1][0], complete=e.complete and len(df) <= max(want, CACHE_MAX_ROWS))
+        query_cache.put(key, e)
+        df = e.df.iloc[-want:]
+    out = df[['open','high','low','close','volume']]
+    if ratio > 1:
+        out = out.resample(tf).agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}).dropna()
+    out = out.copy(); out['price_mean'] = (out['open']+out['close'])/2
+    return out
+@QUERY_SECONDS.time('get_resampled')
+def get_resampled(symbol, timeframe='1Min', limit=10000, start=None, end=None):
+    """OHLCV bars for symbol; served from rollup tables (limit = bars), else resampled from raw ticks (limit = ticks)."""
+    # normalize timeframe strings from UI
+    tf = normalize_timeframe(timeframe)
+    start, end = _to_ms(start), _to_ms(end)
+    out = _rollup(symbol, tf, limit, start, end)
+    if out is not None: return out
+    if start is not None or end is not None:
+        df = get_range(symbol, start, end)
+        return df if df.empty else _resample(df, tf)
+    df = get_recent(symbol, limit=limit)
+    if df.empty: return df
+    key = (symbol, tf); e = query_cache.get(key); first = df.index[0].floor(tf)
+    if e is None or e.df.empty or e.df.index[0] > first:
+        # nothing cached, or the cached bars came from a smaller limit and start too late
+        out = _resample(df, tf)
+    else:
+        # only the last cached bar and newer can change: re-resample ticks from its start
+        last = e.df.index[-1]
+        out = pd.concat([e.df[e.df.index < last], _resample(df[df.index >= last], tf)])
+        out = out[out.index >= first]
+    query_cache.put(key, _Entry(out))
+    return out
+def list_symbols():
+    """Symbols that have stored bars (falling back to raw ticks for pre-rollup databases)."""
+    rows = _query('SELECT DISTINCT symbol FROM bars_1m', ()) or _query('SELECT DISTINCT symbol FROM ticks', ())
+    return sorted(r[0] for r in rows)
+_seeded = set()
+@QUERY_SECONDS.time('get_bars')
+def get_bars(symbol, timeframe='1Min', n=None):
+    # live bars from the in-memory aggregator when streaming, DB resample otherwise
+    tf = normalize_timeframe(timeframe)
+    if not bar_aggregator.has(symbol, tf):
+        df = get_resampled(symbol, tf)
+        return df if n is None else df.tail(n)
+    if (symbol, tf) not in _seeded:
+        _seeded.add((symbol, tf))
+        bar_aggregator.seed(symbol, tf, get_resampled(symbol, tf))
+    return bar_aggregator.latest(symbol, tf, n)
@@ -0,0 +1,98 @@
+"""Local stand-in for the Binance combined trade stream, plus an ingest throughput/latency benchmark.
+
+    python -m backend.ws_standin --symbols 60 --rate 50000 --seconds 10
+"""
+import argparse, asyncio, json, random, threading, time
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import websockets
+from .ingest import IngestManager
+
+def synthetic_trades(symbols, n=10000, seed=0):
+    rng = random.Random(seed)
+    prices = {s: 100.0 + 10*i for i, s in enumerate(symbols)}
+    out = []
+    for k in range(n):
+        s = symbols[k % len(symbols)]
+        prices[s] *= 1 + rng.gauss(0, 1e-4)
+        out.append({'e': 'trade', 's': s, 'p': f"{prices[s]:.4f}", 'q': f"{rng.random():.3f}", 'm': False})
+    return out
+
+def load_trades(path):
+    """Recorded trades from NDJSON, either raw Binance payloads or collector rows (symbol/price/qty)."""
+    out = []
+    with open(path) as fh:
+        for line in fh:
+            if not line.strip(): continue
+            j = json.loads(line); j = j.get('data', j)
+            out.append({'e': 'trade', 's': j.get('s') or j.get('symbol'), 'p': str(j.get('p') or j.get('price')),
+                        'q': str(j.get('q') or j.get('qty') or j.get('size') or 0), 'm': False})
+    return out
+
+class TradeReplayServer:
+    """Serves /stream?streams=... and replays trades for the subscribed symbols at `rate` msgs/sec per connection."""
+    def __init__(self, trades, rate=10000, host='127.0.0.1', port=0):
+        self.trades = trades; self.rate = rate; self.host = host; self.port = port
+        self.sent = 0
+        self._server = None
+
+    async def _handler(self, ws, path=None):
+        path = path or getattr(ws, 'path', None) or ws.request.path
+        streams = parse_qs(urlparse(path).query).get('streams', [''])[0].split('/')
+        wanted = {s.split('@')[0].upper() for s in streams if s}
+        trades = [t for t in self.trades if t['s'] in wanted]
+        if not trades: return
+        t0 = time.perf_counter(); i = 0
+        try:
+            while True:
+                due = int((time.perf_counter() - t0) * self.rate)
+                while i < due:
+                    t = trades[i % len(trades)]; now = int(time.time()*1000)
+                    await ws.send(json.dumps({'stream': t['s'].lower() + '@trade', 'data': dict(t, E=now, T=now)}))
+                    i += 1; self.sent += 1
+                await asyncio.sleep(0.001)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def start(self):
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = next(iter(self._server.sockets)).getsockname()[1]
+        return f"ws://{self.host}:{self.port}"
+
+    async def stop(self):
+        self._server.close(); await self._server.wait_closed()
+
+async def _bench(symbols, rate, seconds, shards, trades):
+    server = TradeReplayServer(trades, rate=rate)
+    base = await server.start()
+    stop = threading.Event(); lat = []; count = [0]
+    def on_trade(sym, ts, price, qty, event_ts):
+        count[0] += 1; lat.append(time.time()*1000 - event_ts)
+    mgr = IngestManager(symbols, on_trade, stop, n_shards=shards, base=base)
+    task = asyncio.ensure_future(mgr.run())
+    await asyncio.sleep(seconds)
+    stop.set(); task.cancel()
+    try: await task
+    except asyncio.CancelledError: pass
+    await server.stop()
+    lat = np.asarray(lat) if lat else np.zeros(1)
+    return {'symbols': len(symbols), 'shards': len(mgr.shards), 'seconds': seconds, 'ticks': count[0],
+            'ticks_per_sec': count[0] / seconds, 'sent': server.sent,
+            'latency_ms': {q: float(np.percentile(lat, p)) for q, p in [('p50', 50), ('p99', 99), ('p999', 99.9), ('max', 100)]},
+            **{k: v for k, v in mgr.stats().items() if k != 'shards'}}
+
+def run_bench(n_symbols=60, rate=5000, seconds=10, shards=None, trades_path=None):
+    symbols = [f"SYM{i:03d}USDT" for i in range(n_symbols)]
+    trades = load_trades(trades_path) if trades_path else synthetic_trades(symbols)
+    if trades_path: symbols = sorted({t['s'] for t in trades})
+    return asyncio.run(_bench(symbols, rate, seconds, shards, trades))
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description='Replay trades over a local websocket and measure ingest throughput.')
+    ap.add_argument('--symbols', type=int, default=60)
+    ap.add_argument('--rate', type=float, default=5000, help='messages/sec per connection')
+    ap.add_argument('--seconds', type=float, default=10)
+    ap.add_argument('--shards', type=int, default=None)
+    ap.add_argument('--trades', default=None, help='NDJSON file of recorded trades')
+    a = ap.parse_args()
+    print(json.dumps(run_bench(a.symbols, a.rate, a.seconds, a.shards, a.trades), indent=2))
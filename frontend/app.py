@@ -2,12 +2,19 @@
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-import streamlit as st, pandas as pd, numpy as np, plotly.graph_objects as go, json, sqlite3, time
+import streamlit as st, pandas as pd, numpy as np, plotly.graph_objects as go
 import plotly.io as pio
-from backend import start_background_stream, stop_background_stream, tick_storage
-from backend.storage import get_resampled
-from backend.analytics import compute_spread_zscore, compute_hedge_ratio_kalman, run_adf_test, compute_hedge_ratio_ols, rolling_correlation, compute_price_stats
-from backend.alerts import add_alert, start_alert_thread, ALERTS
+from backend import start_background_stream, stop_background_stream, tick_storage, bar_aggregator
+from backend.shm_feed import FeedFollower
+from backend.storage import get_bars
+from backend.importer import import_file
+from backend.scanner import scanner
+from backend.backtest import backtest_pair
+from backend.replay import TickReplayer, load_ticks
+from backend.metrics import registry as metrics_registry, scrape as scrape_metrics
+from backend.downsample import downsample_series, downsample_ohlc
+from backend.analytics import compute_spread_zscore, kalman_hedge_series, run_adf_test, compute_hedge_ratio_ols, rolling_correlation, compute_price_stats
+from backend.alerts import add_alert, start_alert_thread, ALERTS, engine as alert_engine
 
 st.set_page_config(page_title='Quant Analytics Lab', layout='wide')
 
@@ -39,7 +46,18 @@ with colA:
     start_clicked = st.button('Start Stream')
 with colB:
     stop_clicked = st.button('Stop Stream')
+@st.cache_resource
+def live_feed():
+    # ticks published over shared memory by the run.py backend process, replayed into this process's bars
+    return FeedFollower(bar_aggregator)
+feed = live_feed()
+feed_live = feed.reader.connected() and not st.session_state.backend_started
+if feed_live:
+    feed.start(); start_alert_thread()
+else:
+    feed.stop()
 if start_clicked and not st.session_state.backend_started:
+    feed.stop()
     start_background_stream(st.session_state.symbols)
     start_alert_thread()
     st.session_state.backend_started = True
@@ -47,9 +65,13 @@ if stop_clicked and st.session_state.backend_started:
     stop_background_stream()
     st.session_state.backend_started = False
 st.sidebar.write('Status: Running' if st.session_state.backend_started else 'Status: Stopped')
-live_counts = {s: len(tick_storage.get(s, [])) for s in st.session_state.symbols}
+if feed_live:
+    feed_counts = feed.reader.counts()
+    live_counts = {s: feed_counts.get(s, 0) for s in st.session_state.symbols}
+else:
+    live_counts = {s: len(tick_storage.get(s, ())) for s in st.session_state.symbols}
 total_ticks = sum(live_counts.values())
-if st.session_state.backend_started:
+if st.session_state.backend_started or feed_live:
     st.sidebar.write(f"Live collecting {len(st.session_state.symbols)} symbol(s)… ({total_ticks} ticks)")
 symbols = st.sidebar.multiselect('Symbols (choose 1 or 2)', options=['BTCUSDT','ETHUSDT','BNBUSDT','ADAUSDT','XRPUSDT'], default=st.session_state.symbols)
 st.session_state.symbols = symbols or ['BTCUSDT','ETHUSDT']
@@ -58,88 +80,97 @@ window = st.sidebar.slider('Rolling window (bars)', min_value=5, max_value=200,
 corr_window = st.sidebar.slider('Correlation window (bars)', min_value=5, max_value=200, value=20)
 
 # Auto refresh while running
-if st.session_state.backend_started and st_autorefresh is not None:
+replaying = st.session_state.get('replay') is not None and not st.session_state.replay.finished
+if (st.session_state.backend_started or feed_live or replaying) and st_autorefresh is not None:
     st_autorefresh(interval=2000, key='live_refresh')
 
-# NDJSON upload
-st.sidebar.subheader('Upload NDJSON (collector output)')
-uploaded = st.sidebar.file_uploader('Upload NDJSON', type=['ndjson','json','csv'])
-if uploaded:
-    raw = uploaded.read().decode(errors='ignore')
-    lines = [l for l in raw.splitlines() if l.strip()]
-    conn = sqlite3.connect(os.path.join('.', 'data_ticks.db')); cur = conn.cursor()
-    skipped = 0; inserted = 0
-    for line in lines:
-        try:
-            j = json.loads(line)
-            if not isinstance(j, dict): skipped += 1; continue
-            ts = int(j.get('ts') or j.get('timestamp') or int(time.time()*1000))
-            sym = j.get('symbol') or j.get('s') or 'UNKNOWN'
-            price = float(j.get('price') or j.get('p') or 0.0); qty = float(j.get('size') or j.get('q') or j.get('qty') or 0.0)
-            cur.execute('INSERT INTO ticks (ts,symbol,price,qty) VALUES (?,?,?,?)', (ts,sym,price,qty))
-            inserted += 1
-        except Exception as e:
-            skipped += 1
-    conn.commit(); conn.close()
-    st.success(f'Uploaded NDJSON: inserted={inserted}, skipped={skipped}')
+# NDJSON / CSV upload
+st.sidebar.subheader('Upload NDJSON / CSV (collector output)')
+uploaded = st.sidebar.file_uploader('Upload NDJSON or CSV', type=['ndjson','json','csv'])
+if uploaded and st.session_state.get('last_upload') != (uploaded.name, uploaded.size):
+    bar = st.sidebar.progress(0.0, text='Importing…')
+    res = import_file(uploaded, progress=lambda n, s: bar.progress(min(uploaded.tell()/max(uploaded.size, 1), 1.0), text=f'{n:,} rows'))
+    bar.empty(); st.session_state.last_upload = (uploaded.name, uploaded.size)
+    st.success(f"Uploaded {uploaded.name}: inserted={res['inserted']}, skipped={res['skipped']} ({res['rows_per_sec']:,.0f} rows/s)")
+
+# Chart/analytics caching: results are keyed by (symbol, tf, last bar) so reruns without a new tick reuse them
+MAX_POINTS = 1500  # roughly the chart's horizontal pixel budget
+def bar_key(d):
+    if d is None or d.empty: return None
+    return (int(d.index[-1].value), float(d['close'].iloc[-1]), len(d))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def pair_analytics(key1, key2, _df, _df2, window, corr_window):
+    spread, z = compute_spread_zscore(_df, _df2, hedge_ratio=1.0, window=window)
+    return spread, z, rolling_correlation(_df, _df2, window=corr_window)
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def price_figure(key1, key2, _df, _df2, primary, secondary, theme):
+    d = downsample_ohlc(_df, MAX_POINTS)
+    fig = go.Figure()
+    fig.add_trace(go.Candlestick(x=d.index, open=d['open'], high=d['high'], low=d['low'], close=d['close'], name=primary))
+    if secondary and not _df2.empty:
+        # overlay secondary close as line (resampled to same index)
+        df2a = downsample_series(_df2['close'].reindex(_df.index, method='nearest', tolerance=pd.Timedelta('1min')).ffill(), MAX_POINTS)
+        fig.add_trace(go.Scattergl(x=df2a.index, y=df2a.values, mode='lines', name=secondary, yaxis='y2'))
+        # add secondary axis
+        fig.update_layout(yaxis2=dict(overlaying='y', side='right', showgrid=False, title=secondary+' Price'))
+    fig.update_layout(height=420, template='plotly_dark' if theme=='dark' else 'plotly', legend=dict(orientation='h'))
+    return fig
+
+def export_button(key, prepare_label, download_label, make, file_name, mime):
+    """Build an export only when asked; the download button then survives autorefresh reruns until it is used."""
+    if st.button(prepare_label, key=f'{key}_prepare'):
+        try: st.session_state[key] = (file_name, make())
+        except Exception as e: st.error(f'{prepare_label} failed: {e}')
+    ready = st.session_state.get(key)
+    if ready is not None and ready[0] == file_name:
+        st.download_button(download_label, data=ready[1], file_name=file_name, mime=mime, key=f'{key}_download',
+                           on_click=lambda: st.session_state.pop(key, None))
 
 # Main layout
 cols = st.columns([3,1])
 with cols[0]:
     st.subheader('Price Comparison & Candlestick')
     primary = st.session_state.symbols[0]
-    df = get_resampled(primary, timeframe=('1Min' if tf=='1Min' else '1S' if tf=='1S' else '5Min'))
+    df = get_bars(primary, timeframe=('1Min' if tf=='1Min' else '1S' if tf=='1S' else '5Min'))
     if df is None or df.empty:
         st.info('No resampled data yet. Wait for backend to collect ticks or upload NDJSON.')
     else:
         # Price comparison overlay if second symbol selected
-        fig = go.Figure()
-        fig.add_trace(go.Candlestick(x=df.index, open=df['open'], high=df['high'], low=df['low'], close=df['close'], name=primary))
-        if len(st.session_state.symbols) >= 2:
-            secondary = st.session_state.symbols[1]
-            df2 = get_resampled(secondary, timeframe=('1Min' if tf=='1Min' else '1S' if tf=='1S' else '5Min'))
-            if not df2.empty:
-                # overlay secondary close as line (resampled to same index)
-                df2a = df2['close'].reindex(df.index, method='nearest', tolerance=pd.Timedelta('1min')).ffill()
-                fig.add_trace(go.Scatter(x=df2a.index, y=df2a.values, mode='lines', name=secondary, yaxis='y2'))
-                # add secondary axis
-                fig.update_layout(yaxis2=dict(overlaying='y', side='right', showgrid=False, title=secondary+' Price'))
-        fig.update_layout(height=420, template='plotly_dark' if st.session_state.theme=='dark' else 'plotly', legend=dict(orientation='h'))
+        df2 = pd.DataFrame()
+        secondary = st.session_state.symbols[1] if len(st.session_state.symbols) >= 2 else None
+        if secondary:
+            df2 = get_bars(secondary, timeframe=('1Min' if tf=='1Min' else '1S' if tf=='1S' else '5Min'))
+        # cache keys carry the last bar (ts, close) so cached results refresh as the forming bar updates
+        key1 = (primary, tf, bar_key(df)); key2 = (secondary, tf, bar_key(df2))
+        fig = price_figure(key1, key2, df, df2, primary, secondary, st.session_state.theme)
         st.plotly_chart(fig, use_container_width=True)
-        # Download price chart PNG
-        try:
-            png_price = pio.to_image(fig, format='png', scale=2)
-            st.download_button('Download Price Chart PNG', data=png_price, file_name=f'price_{primary}.png', mime='image/png')
-        except Exception:
-            pass
+        # PNG export renders through kaleido only on request
+        export_button('price_png', 'Render Price Chart PNG', 'Download Price Chart PNG', lambda: pio.to_image(fig, format='png', scale=2), f'price_{primary}.png', 'image/png')
 
         # Spread & z-score over time + analysis summary
-        if len(st.session_state.symbols) >= 2 and not df.empty and not df2.empty:
+        if secondary and not df.empty and not df2.empty:
             st.subheader('Spread & Z-Score (time series)')
-            spread, z = compute_spread_zscore(df, df2, hedge_ratio=1.0, window=window)
+            spread, z, rc = pair_analytics(key1, key2, df, df2, window, corr_window)
             # line chart with two axes (spread & zscore)
+            sp_ds, z_ds = downsample_series(spread, MAX_POINTS), downsample_series(z, MAX_POINTS)
             fig2 = go.Figure()
-            fig2.add_trace(go.Scatter(x=spread.index, y=spread.values, name='Spread', line=dict(color='cyan')))
-            fig2.add_trace(go.Scatter(x=z.index, y=z.values, name='Z-Score', line=dict(color='magenta'), yaxis='y2'))
+            fig2.add_trace(go.Scattergl(x=sp_ds.index, y=sp_ds.values, name='Spread', line=dict(color='cyan')))
+            fig2.add_trace(go.Scattergl(x=z_ds.index, y=z_ds.values, name='Z-Score', line=dict(color='magenta'), yaxis='y2'))
             fig2.update_layout(yaxis2=dict(overlaying='y', side='right', title='Z-Score'), template='plotly_dark' if st.session_state.theme=='dark' else 'plotly', height=350)
             st.plotly_chart(fig2, use_container_width=True)
-            try:
-                png_spread = pio.to_image(fig2, format='png', scale=2)
-                st.download_button('Download Spread & Z PNG', data=png_spread, file_name=f'spread_z_{primary}_{secondary}.png', mime='image/png')
-            except Exception:
-                pass
+            export_button('spread_png', 'Render Spread & Z PNG', 'Download Spread & Z PNG', lambda: pio.to_image(fig2, format='png', scale=2), f'spread_z_{primary}_{secondary}.png', 'image/png')
 
             # Rolling correlation
             st.subheader('Rolling Correlation')
-            rc = rolling_correlation(df, df2, window=corr_window)
-            st.line_chart(rc.fillna(0))
+            st.line_chart(downsample_series(rc.fillna(0), MAX_POINTS))
 
             # Kalman hedge ratio
             st.subheader('Dynamic Hedge Ratio (Kalman)')
-            hr_ts = compute_hedge_ratio_kalman(df['close'] if 'close' in df.columns else df['price'], df2['close'] if 'close' in df2.columns else df2['price'])
+            hr_ts = kalman_hedge_series((primary, secondary, tf), df['close'] if 'close' in df.columns else df['price'], df2['close'] if 'close' in df2.columns else df2['price'])
             if len(hr_ts) > 0:
-                hr_idx = df['close'].dropna().index[:len(hr_ts)]
-                st.line_chart(pd.Series(hr_ts, index=hr_idx))
+                st.line_chart(downsample_series(hr_ts, MAX_POINTS))
 
             # Analysis summary
             st.subheader('Analysis Summary')
@@ -160,10 +191,21 @@ with cols[0]:
                 else:
                     st.success('Z-score within normal range.')
 
-            # Download spread and zscore CSV
-            df_out = pd.DataFrame({'timestamp': spread.index, 'spread': spread.values, 'zscore': z.values})
-            csv = df_out.to_csv(index=False)
-            st.download_button('Download spread & zscore CSV', data=csv, file_name=f'spread_zscore_{primary}_{secondary}.csv', mime='text/csv')
+            # Spread and zscore CSV is built only when asked for
+            export_button('spread_csv', 'Prepare spread & zscore CSV', 'Download spread & zscore CSV',
+                          lambda: pd.DataFrame({'timestamp': spread.index, 'spread': spread.values, 'zscore': z.values}).to_csv(index=False),
+                          f'spread_zscore_{primary}_{secondary}.csv', 'text/csv')
+
+            # Parameter-grid backtest on stored bars
+            with st.expander('Backtest z-score strategy (parameter grid)'):
+                bt_windows = st.multiselect('Windows', [10, 20, 30, 60, 120, 240], default=[20, 30, 60])
+                bt_entries = st.multiselect('Entry |z|', [1.0, 1.5, 2.0, 2.5, 3.0], default=[1.5, 2.0, 2.5])
+                bt_exits = st.multiselect('Exit |z|', [0.0, 0.25, 0.5, 1.0], default=[0.0, 0.5])
+                bt_cost = st.number_input('Cost (bps per unit turnover)', value=0.0, min_value=0.0)
+                if st.button('Run backtest'):
+                    res, secs = backtest_pair(primary, secondary, tf, windows=bt_windows, entries=bt_entries, exits=bt_exits, cost_bps=bt_cost)
+                    st.caption(f'{len(res)} combinations in {secs:.2f}s')
+                    st.dataframe(res.head(25), hide_index=True)
 
 with cols[1]:
     st.subheader('Quick Stats & Controls')
@@ -181,17 +223,57 @@ with cols[1]:
     val = st.number_input('Threshold', value=2.0)
     if st.button('Create Alert'):
         a = {'id': len(ALERTS)+1, 'metric': metric, 'op': op, 'value': val, 'symbols': st.session_state.symbols, 'tf': tf, 'window': window, 'hedge_ratio': 1.0}
-        add_alert(a); st.success('Alert created. Check console for triggers.')
+        add_alert(a); st.success('Alert created.')
+    if alert_engine.recent:
+        for ev in list(alert_engine.recent)[-5:][::-1]:
+            a = ev['alert']; when = pd.to_datetime(ev['ts'], unit='ms')
+            st.warning(f"#{a['id']} {a['metric']} {a['op']} {a['value']} on {'/'.join(a['symbols'][:2])}: {ev['value']:.3f} @ {when}")
+    if alert_engine.evaluations:
+        es = alert_engine.stats(); st.caption(f"{es['signals']} signal(s), {es['evaluations']} evals, mean {es['mean_eval_ms']:.3f} ms")
 
     st.markdown('### Live tick counts')
-    counts = {s: len(tick_storage.get(s, [])) for s in st.session_state.symbols}
-    for k,v in counts.items(): st.write(f"{k}: {v}")
+    if feed_live:
+        for k, v in live_counts.items(): st.write(f"{k}: {v} (shared feed)")
+    for s in ([] if feed_live else st.session_state.symbols):
+        ring = tick_storage.get(s)
+        st.write(f"{s}: {len(ring) if ring is not None else 0}" + (f" (dropped {ring.overflow})" if ring is not None and ring.overflow else ''))
+
+    st.markdown('### Pipeline metrics')
+    with st.expander('Latency quantiles and counters'):
+        # this process's registry when streaming here, else the backend process's /metrics endpoint
+        samples = metrics_registry.snapshot() if st.session_state.backend_started else scrape_metrics()
+        if not samples:
+            st.caption('No metrics endpoint reachable (start the stream or run.py).')
+        else:
+            q = [(n[:-len('_recent')], l.get('stamp') or l.get('fn') or '', l['quantile'], v) for n, l, v in samples if n.endswith('_recent')]
+            if q:
+                qdf = pd.DataFrame(q, columns=['metric', 'label', 'quantile', 'value']).pivot_table(index=['metric', 'label'], columns='quantile', values='value')
+                st.dataframe(qdf, use_container_width=True)
+            other = [(n, ','.join(f'{k}={v}' for k, v in l.items()), v) for n, l, v in samples if not n.endswith(('_recent', '_sum'))]
+            st.dataframe(pd.DataFrame(other, columns=['metric', 'labels', 'value']), hide_index=True, use_container_width=True)
+
+    st.markdown('### Pair scanner')
+    scanner.set_timeframe(tf)
+    if st.button('Start scanner'): scanner.start()
+    scan_tbl = scanner.table()
+    if not scan_tbl.empty:
+        st.dataframe(scan_tbl[['pair','hedge_ratio','corr','corr_recent','pvalue']].head(10), hide_index=True)
+        st.caption(f"{len(scan_tbl)} pairs, last scan {scanner.last_scan_secs:.2f}s")
+    if scanner.skipped: st.caption(f"Not enough bars yet: {', '.join(scanner.skipped)}")
 
     st.markdown('### Replay / Export')
-    if st.button('Replay last uploaded NDJSON (simulated)'):
-        st.info('Replay started (simulated) - not implemented in this build.')
-    if st.button('Download latest resampled CSV'):
-        try:
-            out = df.reset_index().to_csv(index=False); st.download_button('Download CSV', data=out, file_name=f'{primary}_resampled.csv')
-        except Exception as e:
-            st.error('No data to download: '+str(e))
+    replay_speed = st.select_slider('Replay speed', options=[1, 10, 60, 600, 'max'], value=60)
+    if st.button('Replay last uploaded NDJSON'):
+        if uploaded is None:
+            st.warning('Upload an NDJSON/CSV file first.')
+        else:
+            # the upload is already stored, so the replay drives bars and alerts without re-persisting
+            rp = TickReplayer(load_ticks(uploaded), speed=None if replay_speed == 'max' else replay_speed, persist=False, timeframe=tf)
+            rp.start(); st.session_state.replay = rp
+    rp = st.session_state.get('replay')
+    if rp is not None:
+        rs = rp.stats()
+        st.progress(rs['replayed'] / max(rs['ticks'], 1), text=f"Replay {rs['replayed']:,}/{rs['ticks']:,} ticks, {rs['alerts_fired']} alerts" + (' (done)' if rs['finished'] else ''))
+        if rs['error']: st.error('Replay failed: ' + rs['error'])
+        if not rs['finished'] and st.button('Stop replay'): rp.stop()
+    export_button('resampled_csv', 'Download latest resampled CSV', 'Download CSV', lambda: df.reset_index().to_csv(index=False), f'{primary}_resampled.csv', 'text/csv')
@@ -0,0 +1,7 @@
+import os, sys, tempfile
+
+# importing the backend package opens the tick database; keep tests off the real one
+_tmp = tempfile.mkdtemp(prefix='quant-tests-')
+os.environ.setdefault('QUANT_DB_PATH', os.path.join(_tmp, 'ticks.db'))
+os.environ.setdefault('QUANT_ARCHIVE_DIR', os.path.join(_tmp, 'archive'))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,30 @@
+import numpy as np
+from backend import partitions
+from backend.sqlite_io import get_writer
+from backend.storage import get_range, invalidate_cache
+
+DAY = partitions.DAY_MS
+T0 = 1577836800000  # 2020-01-01, older than any other test's ticks
+
+def _write(symbol, ts):
+    ts = np.asarray(ts, 'int64')
+    with get_writer().transaction() as cur:
+        partitions.init_tables(cur)
+        partitions.insert(cur, symbol, ts, ts.astype('float64'), np.ones(len(ts)))
+
+def _tables():
+    with get_writer().transaction() as cur:
+        return [n for _, n in partitions.list_tables(cur)]
+
+def test_range_spans_archived_and_live_partitions(tmp_path):
+    sym = 'PARTTEST'
+    _write(sym, [T0 + 1000, T0 + 2000, T0 + DAY + 1000, T0 + 5*DAY + 1000])
+    done = partitions.compact(get_writer(), retention_days=3, directory=str(tmp_path), now_ms=T0 + 6*DAY)
+    assert dict(done) == {partitions.table_name(T0): 2, partitions.table_name(T0 + DAY): 1}
+    assert partitions.table_name(T0 + 5*DAY) in _tables() and partitions.table_name(T0) not in _tables()
+    # a late tick for an archived day lands in a fresh partition and is read alongside the archive
+    _write(sym, [T0 + 3000])
+    invalidate_cache(sym)
+    assert get_range(sym, T0, T0 + 6*DAY)['price'].tolist() == [T0 + 1000, T0 + 2000, T0 + 3000, T0 + DAY + 1000, T0 + 5*DAY + 1000]
+    assert get_range(sym, T0 + 1500, T0 + DAY + 1000)['price'].tolist() == [T0 + 2000, T0 + 3000, T0 + DAY + 1000]
+    assert get_range('OTHER', T0, T0 + 6*DAY).empty
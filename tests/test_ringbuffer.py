@@ -0,0 +1,56 @@
+import numpy as np
+from backend.ringbuffer import TickRing, TickStore
+
+def _fill(ring, ts):
+    for t in ts: ring.append(t, float(t), 1.0)
+
+def test_append_and_drain():
+    r = TickRing(4)
+    _fill(r, [1, 2, 3])
+    ts, price, qty = r.drain()
+    assert ts.tolist() == [1, 2, 3] and price.tolist() == [1.0, 2.0, 3.0] and qty.tolist() == [1.0]*3
+    assert len(r) == 0 and r.overflow == 0
+    assert r.drain()[0].size == 0
+
+def test_drain_across_wraparound():
+    r = TickRing(4)
+    _fill(r, [1, 2, 3]); r.drain()
+    _fill(r, [4, 5, 6])          # physical slots 3, 0, 1
+    assert r.drain()[0].tolist() == [4, 5, 6]
+    assert r.overflow == 0
+
+def test_append_overflow_keeps_newest():
+    r = TickRing(4)
+    _fill(r, range(1, 7))
+    assert r.overflow == 2 and len(r) == 4
+    assert r.drain()[0].tolist() == [3, 4, 5, 6]
+
+def test_extend_matches_append():
+    for n in (3, 4, 6, 11):
+        a, b = TickRing(4), TickRing(4)
+        _fill(a, range(n))
+        b.extend(np.arange(n), np.arange(n, dtype='float64'), np.ones(n))
+        assert b.overflow == a.overflow, n
+        assert b.drain()[0].tolist() == a.drain()[0].tolist(), n
+
+def test_extend_wraps_after_partial_drain():
+    r = TickRing(4)
+    r.extend([1, 2, 3], [1.0, 2.0, 3.0], [1.0]*3); r.drain()
+    r.extend([4, 5, 6, 7, 8], [4.0, 5.0, 6.0, 7.0, 8.0], [1.0]*5)
+    assert r.overflow == 1
+    assert r.drain()[0].tolist() == [5, 6, 7, 8]
+
+def test_latest_segments_across_wraparound():
+    r = TickRing(4)
+    _fill(r, range(1, 7))
+    segs = r.segments()
+    assert len(segs) == 2 and [s[0].tolist() for s in segs] == [[3, 4], [5, 6]]
+    assert r.latest(3)[0].tolist() == [4, 5, 6]
+    assert r.latest()[0].tolist() == [3, 4, 5, 6]
+
+def test_store_counts_and_overflow():
+    st = TickStore(2)
+    _fill(st['A'], [1, 2, 3]); _fill(st['B'], [1])
+    assert st.counts() == {'A': 2, 'B': 1}
+    assert st.overflow() == {'A': 1, 'B': 0}
+    assert 'A' in st and st.get('C') is None
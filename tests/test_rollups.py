@@ -0,0 +1,30 @@
+import numpy as np, pandas as pd
+from backend import partitions, rollups
+from backend.sqlite_io import get_writer
+
+T0 = 1704153600000  # 2024-01-02
+
+def _setup():
+    with get_writer().transaction() as cur:
+        rollups.init_tables(cur); partitions.init_tables(cur)
+
+def _bars(table, symbol):
+    with get_writer().transaction() as cur:
+        return cur.execute(f'SELECT ts, open, high, low, close, volume, n FROM {table} WHERE symbol=? ORDER BY ts', (symbol,)).fetchall()
+
+def test_split_flushes_merge_to_raw_resample():
+    sym = 'ROLLTEST'; _setup()
+    rng = np.random.default_rng(3)
+    ts = T0 + np.sort(rng.choice(12*60_000, 400, replace=False)).astype('int64')
+    price = 100 + rng.standard_normal(len(ts)).cumsum(); qty = rng.uniform(0.1, 2.0, len(ts))
+    # shuffled flushes, so bars are split across writes and later flushes carry earlier ticks
+    order = rng.permutation(len(ts))
+    for part in np.array_split(order, 3):
+        rollups.write_batches(get_writer(), {sym: (ts[part], price[part], qty[part])})
+    df = pd.DataFrame({'price': price, 'qty': qty}, index=pd.to_datetime(ts, unit='ms'))
+    for table, ms in rollups.ROLLUPS.values():
+        ref = df['price'].resample(f'{ms}ms').ohlc().join(df['qty'].resample(f'{ms}ms').sum().rename('volume')).dropna()
+        got = np.array(_bars(table, sym))
+        assert got[:, 0].astype('int64').tolist() == ref.index.as_unit('ms').asi8.tolist(), table
+        assert np.allclose(got[:, 1:6], ref[['open', 'high', 'low', 'close', 'volume']].to_numpy()), table
+        assert int(got[:, 6].sum()) == len(ts), table
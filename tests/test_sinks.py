@@ -0,0 +1,44 @@
+import time
+import numpy as np
+from backend.sinks import DROP_OLDEST, FakeSink, MongoSink, SinkHub
+
+def _batch(ts):
+    ts = np.asarray(ts, 'int64')
+    return {'S': (ts, ts.astype('float64'), np.ones(len(ts)))}
+
+class _BulkError(Exception):
+    def __init__(self, details):
+        super().__init__('bulk write error'); self.details = details
+
+class _Collection:
+    """Fails the first insert_many for the documents at the `reject` indices ({index: error code})."""
+    def __init__(self, reject):
+        self.reject = reject; self.calls = []; self.stored = []
+
+    def insert_many(self, docs, ordered=True):
+        self.calls.append([d['ts'] for d in docs])
+        if len(self.calls) == 1:
+            self.stored += [d['ts'] for i, d in enumerate(docs) if i not in self.reject]
+            raise _BulkError({'writeErrors': [{'index': i, 'code': c} for i, c in self.reject.items()]})
+        self.stored += [d['ts'] for d in docs]
+
+def test_mongo_retries_only_rejected_documents():
+    col = _Collection({1: 91, 3: 11000})   # a transient failure and a duplicate key
+    sink = MongoSink(col, backoff_base=0.0)
+    sink._write_with_retry(_batch([1, 2, 3, 4, 5]), 5)
+    assert col.calls == [[1, 2, 3, 4, 5], [2]]
+    assert sorted(col.stored) == [1, 2, 3, 5]
+    assert sink.written == 5 and sink.retried == 1 and sink.failed == 0
+
+def test_slow_sink_drops_oldest_without_stalling_others():
+    fast = FakeSink('test-fast')
+    slow = FakeSink('test-slow', latency=1.0, max_ticks=30, policy=DROP_OLDEST)
+    hub = SinkHub([fast, slow]); hub.start()
+    t0 = time.perf_counter()
+    for k in range(20):
+        assert hub.submit(_batch(range(10*k, 10*k + 10))) == {'test-fast': True, 'test-slow': True}
+    assert fast.flush(timeout=5)
+    assert time.perf_counter() - t0 < slow.latency   # not held up by the slow sink's write
+    assert fast.written == 200
+    hub.stop()
+    assert slow.dropped > 0 and slow.written + slow.dropped == 200
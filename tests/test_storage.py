@@ -0,0 +1,29 @@
+import numpy as np
+from backend import partitions
+from backend.sqlite_io import get_writer
+from backend.storage import get_recent, invalidate_cache, query_cache
+
+T0 = 1704067200000  # 2024-01-01
+
+def _write(symbol, ts, price):
+    ts = np.asarray(ts, 'int64')
+    with get_writer().transaction() as cur:
+        partitions.init_tables(cur)
+        partitions.insert(cur, symbol, ts, np.asarray(price, 'float64'), np.ones(len(ts)))
+
+def test_recent_tops_up_past_watermark():
+    sym = 'CACHETEST'; invalidate_cache(sym)
+    _write(sym, [T0, T0 + 1000, T0 + 2000, T0 + 3000, T0 + 3000], [1, 2, 3, 4, 5])
+    assert get_recent(sym, 3)['price'].tolist() == [3, 4, 5]
+    # a tick sharing the watermark ts and one past it; the two cached at the watermark must not repeat
+    _write(sym, [T0 + 3000, T0 + 4000], [6, 7])
+    assert get_recent(sym, 3)['price'].tolist() == [5, 6, 7]
+    assert query_cache.get((sym, 'tick')).df['price'].tolist() == [3, 4, 5, 6, 7]
+
+def test_recent_rereads_when_limit_grows():
+    sym = 'CACHEGROW'; invalidate_cache(sym)
+    _write(sym, [T0 + i*1000 for i in range(6)], range(6))
+    assert get_recent(sym, 2)['price'].tolist() == [4, 5]
+    assert get_recent(sym, 10)['price'].tolist() == list(range(6))
+    e = query_cache.get((sym, 'tick'))
+    assert e.complete and len(e.df) == 6